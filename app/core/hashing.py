@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import exceptions, status
+from core import metrics
+
+
+class HashingBusy(exceptions.APIException):
+    """Raised when the password hashing queue stays full"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins at once, try again shortly.'
+    default_code = 'hashing_busy'
+
+    def __init__(self, wait):
+        super().__init__()
+        # Sent as Retry-After by DRF's exception handler
+        self.wait = wait
+
+
+class HashingPool:
+    """Thread pool running password hashing with a bounded queue
+
+    At most `threads` hashes run at once, so a burst of logins can't
+    take every worker's CPU; up to `queue` more wait for a thread, and
+    callers beyond that wait up to `timeout` seconds for room before
+    HashingBusy is raised.
+    """
+
+    def __init__(self, threads, queue, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='password-hashing'
+        )
+        self._slots = threading.BoundedSemaphore(threads + queue)
+
+    def run(self, func, *args):
+        """Return func(*args) computed on the pool"""
+        if not self._slots.acquire(timeout=self.timeout):
+            metrics.increment('password_hashing.rejected')
+            # Retry-After is in whole seconds, at least one
+            raise HashingBusy(wait=max(math.ceil(self.timeout), 1))
+        queued = time.perf_counter()
+        metrics.increment('password_hashing.queue_depth')
+
+        def call():
+            started = time.perf_counter()
+            metrics.increment('password_hashing.queue_depth', -1)
+            metrics.increment(
+                'password_hashing.wait_seconds', started - queued
+            )
+            try:
+                return func(*args)
+            finally:
+                metrics.increment('password_hashing.count')
+                metrics.increment(
+                    'password_hashing.seconds', time.perf_counter() - started
+                )
+                self._slots.release()
+        return self._executor.submit(call).result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool():
+    """Return the process' password hashing pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(
+                settings.PASSWORD_HASHING_THREADS,
+                settings.PASSWORD_HASHING_QUEUE,
+                settings.PASSWORD_HASHING_TIMEOUT
+            )
+        return _pool
+
+
+def make_password(raw_password):
+    """Return the hash of raw_password, computed on the pool"""
+    return pool().run(hashers.make_password, raw_password)
+
+
+def _check(raw_password, encoded):
+    """Return whether the password matches and its new hash if outdated"""
+    rehashed = []
+    valid = hashers.check_password(
+        raw_password, encoded,
+        lambda raw: rehashed.append(hashers.make_password(raw))
+    )
+    return valid, rehashed[0] if rehashed else None
+
+
+def check_password(raw_password, encoded):
+    """Return (valid, new hash or None) computed on the pool
+
+    The new hash is set when the hasher or its iterations changed since
+    the password was stored; saving it is left to the caller's thread.
+    """
+    return pool().run(_check, raw_password, encoded)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from recipe.images import build_variants, finish_variants
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the resized variants of recipe images that have none, "
+        "on the image worker pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help="Render the variants of every image again"
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        """Render the images batch by batch and record their variants"""
+        recipes = Recipe.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            recipes = recipes.filter(image_variants='')
+        recipes = recipes.only('id', 'user_id', 'image').order_by('id')
+
+        rendered = failed = 0
+        last_id = 0
+        while True:
+            # Keyset batches, as finished recipes leave the queryset
+            batch = list(recipes.filter(id__gt=last_id)[
+                :options['batch_size']
+            ])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            futures = [(recipe, build_variants(recipe)) for recipe in batch]
+            for recipe, future in futures:
+                if finish_variants(recipe, future):
+                    rendered += 1
+                elif future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(
+                        f"Recipe {recipe.id}: {future.exception()}"
+                    )
+            self.stdout.write(f"{rendered} rendered, {failed} failed")
+        self.stdout.write(self.style.SUCCESS('Image variants are built'))
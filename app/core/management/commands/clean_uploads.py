@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from recipe.uploads import discard_expired
+
+
+class Command(BaseCommand):
+    help = "Delete chunked image uploads abandoned for RECIPE_UPLOAD_EXPIRY"
+
+    def handle(self, *args, **options):
+        """Delete the expired uploads and their partial files"""
+        count = discard_expired()
+        self.stdout.write(self.style.SUCCESS(f'{count} uploads deleted'))
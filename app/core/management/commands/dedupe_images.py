@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipe.blobs import collect_blobs, dedupe_image, recount_refs
+from recipe.models import Recipe
+from recipe.storage import BLOB_DIR
+
+
+class Command(BaseCommand):
+    help = (
+        "Move recipe images into content-addressed blobs, storing equal "
+        "images once, then delete the blobs no recipe uses"
+    )
+
+    def handle(self, *args, **options):
+        """Dedupe the images, recount the blob references and collect"""
+        if not settings.RECIPE_IMAGE_CONTENT_ADDRESSED:
+            raise CommandError("Set RECIPE_IMAGE_CONTENT_ADDRESSED first")
+        storage = Recipe._meta.get_field('image').storage
+        recipes = Recipe.objects.exclude(image='').exclude(
+            image=None
+        ).exclude(image__startswith=BLOB_DIR + '/').order_by('id')
+
+        moved, left = 0, set()
+        for recipe in recipes.iterator():
+            try:
+                old = dedupe_image(recipe, storage)
+            except FileNotFoundError:
+                self.stderr.write(f"Recipe {recipe.id}: image file missing")
+                continue
+            except ValueError:
+                self.stderr.write(f"Recipe {recipe.id}: not an image")
+                continue
+            if old is not None:
+                moved += 1
+                left.add(old)
+        for name in left:
+            if not Recipe.objects.filter(image=name).exists():
+                storage.delete(name)
+        self.stdout.write(f"{moved} images moved into blobs")
+
+        recount_refs()
+        deleted = collect_blobs(storage, settings.RECIPE_IMAGE_BLOB_GRACE)
+        self.stdout.write(f"{deleted} unused blobs deleted")
+        self.stdout.write(self.style.SUCCESS('Recipe images are deduped'))
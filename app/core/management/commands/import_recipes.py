@@ -0,0 +1,86 @@
+import os
+import time
+from itertools import islice
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from recipe.export import chunked
+from recipe.importer import (
+    clean_record, import_batch, read_csv, read_ndjson, record_fields
+)
+from recipe.models import ImportCheckpoint
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import recipes from a CSV or NDJSON file. Tag and ingredient "
+        "names are resolved or created, CSV cells separate them with |. "
+        "An interrupted import resumes after its last committed batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--user', required=True, help="Email of the recipes' owner"
+        )
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help="Input format, taken from the file extension by default"
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help="Name of the checkpoint, the absolute path by default"
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignore the checkpoint and import from the first record"
+        )
+
+    def handle(self, *args, **options):
+        """Stream the file into the database batch by batch"""
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if fmt not in READERS:
+            raise CommandError(f"Unknown format {fmt!r}, use --format")
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']!r}")
+
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            source=options['checkpoint'] or os.path.abspath(path)
+        )
+        if options['restart']:
+            checkpoint.position = 0
+        if checkpoint.position:
+            self.stdout.write(
+                f"Resuming after record {checkpoint.position}"
+            )
+
+        fields = record_fields()
+        imported = skipped = 0
+        start = time.monotonic()
+        with open(path, newline='') as file:
+            records = islice(READERS[fmt](file), checkpoint.position, None)
+            for batch in chunked(records, options['batch_size']):
+                cleaned = []
+                for offset, record in enumerate(batch):
+                    try:
+                        cleaned.append(clean_record(record, fields))
+                    except ValidationError as error:
+                        skipped += 1
+                        number = checkpoint.position + offset + 1
+                        self.stderr.write(f"Record {number}: {error}")
+                import_batch(user, checkpoint, cleaned, len(batch))
+                imported += len(cleaned)
+                rate = imported / max(time.monotonic() - start, 1e-6)
+                self.stdout.write(
+                    f"{checkpoint.position} records read, {imported} "
+                    f"imported ({rate:.0f} rows/s)"
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} recipes, skipped {skipped}"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from recipe.counts import RELATIONS, recount
+
+
+class Command(BaseCommand):
+    help = "Recompute the recipe_count of tags and ingredients that drifted"
+
+    def handle(self, *args, **options):
+        """Recount every model and report the rows fixed"""
+        for through, (model, _) in RELATIONS.items():
+            fixed = recount(model, through)
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {fixed} fixed"
+            )
+        self.stdout.write(self.style.SUCCESS('Recipe counts are up to date'))
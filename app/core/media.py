@@ -0,0 +1,95 @@
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.http import Http404
+from django.utils._os import safe_join
+from django.core.exceptions import SuspiciousFileOperation
+
+# Bytes read from disk and sent at a time
+BLOCK_SIZE = 64 * 1024
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Content types shown in the browser, others are sent as downloads;
+# SVG is left out as it can carry scripts
+INLINE_TYPES = {'image/gif', 'image/jpeg', 'image/png', 'image/webp'}
+
+
+def media_file(path, document_root=None):
+    """Return the absolute path and stat of a file under the media root
+
+    Files in MEDIA_PRIVATE_DIRS, such as partial uploads, are not found.
+    """
+    root = document_root or settings.MEDIA_ROOT
+    try:
+        full_path = safe_join(root, path)
+        private = [
+            safe_join(root, directory) + os.sep
+            for directory in settings.MEDIA_PRIVATE_DIRS
+        ]
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('No such media file.')
+    if any(full_path.startswith(directory) for directory in private):
+        raise Http404('No such media file.')
+    if not os.path.isfile(full_path):
+        raise Http404('No such media file.')
+    return full_path, stat
+
+
+def content_type(path):
+    """Return the Content-Type and Content-Encoding of a file"""
+    content_type, encoding = mimetypes.guess_type(path)
+    return content_type or 'application/octet-stream', encoding
+
+
+def safety_headers(content_type):
+    """Return the headers keeping browsers from running a media file"""
+    headers = {'X-Content-Type-Options': 'nosniff'}
+    if content_type not in INLINE_TYPES:
+        headers['Content-Disposition'] = 'attachment'
+    return headers
+
+
+def file_etag(stat):
+    """Return a strong ETag changing with the file's mtime and size"""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """Return the (first, last) bytes a Range header asks for
+
+    Returns None when the header is missing, malformed or asks for
+    several ranges, all answered with the whole file, and raises
+    ValueError when the range lies past the end of the file.
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # The last `last` bytes
+        length = int(last)
+        if not length:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        if first < size:
+            return None
+        raise ValueError(header)
+    return first, last
+
+
+def read_range(path, first, length):
+    """Yield length bytes of the file at path from first on"""
+    with open(path, 'rb') as file:
+        file.seek(first)
+        while length > 0:
+            data = file.read(min(BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
@@ -0,0 +1,26 @@
+from collections import Counter
+from threading import Lock
+
+_counters = Counter()
+_lock = Lock()
+
+
+def increment(name, amount=1):
+    """Add amount to the counter name"""
+    with _lock:
+        _counters[name] += amount
+
+
+def snapshot():
+    """Return the current value of every counter
+
+    Counters are kept per process, each worker reports its own.
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    """Set all counters back to zero"""
+    with _lock:
+        _counters.clear()
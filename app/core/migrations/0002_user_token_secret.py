@@ -0,0 +1,19 @@
+# Generated by Django 3.0.5 on 2026-10-18 21:00
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_secret',
+            field=models.CharField(default=core.models.new_token_secret, editable=False, max_length=32),
+        ),
+    ]
@@ -1,5 +1,7 @@
+import secrets
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
+from core import hashing
 # read-more, creating a custom user model manager
 # https://docs.djangoproject.com/en/3.0/topics/auth/customizing/#a-full-example
 
@@ -45,6 +47,12 @@ class CustomUserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+
+def new_token_secret():
+    """Return a random secret revoking a user's refresh tokens on change"""
+    return secrets.token_hex(16)
+
+
 # read-more
 # https://docs.djangoproject.com/en/3.0/topics/auth/customizing/#specifying-a-custom-user-model
 # creating a custom user model
@@ -57,6 +65,10 @@ class User(AbstractBaseUser):
     admin = models.BooleanField(default=False)
     staff = models.BooleanField(default=False)
     active = models.BooleanField(default=True)
+    # Changed with the password but not when its hash is upgraded
+    token_secret = models.CharField(
+        max_length=32, default=new_token_secret, editable=False
+    )
 
     USERNAME_FIELD = 'email'  # used as the username, i.e., login
     REQUIRED_FIELDS = ['name']
@@ -76,6 +88,22 @@ class User(AbstractBaseUser):
         # Simplest possible answer: Yes, always
         return True
 
+    def set_password(self, raw_password):
+        """Set the password, hashing it on the bounded hashing pool"""
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+        self.token_secret = new_token_secret()
+
+    def check_password(self, raw_password):
+        """Check the password on the hashing pool, upgrading its hash"""
+        valid, rehashed = hashing.check_password(raw_password, self.password)
+        if rehashed is not None:
+            self.password = rehashed
+            # Hash upgrades aren't password changes
+            self._password = None
+            self.save(update_fields=['password'])
+        return valid
+
     @property
     def is_active(self):
         return self.active
@@ -1,7 +1,18 @@
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
-from django.test import TestCase
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
+from recipe import importer
+from recipe.tests.test_images import jpeg
+from recipe.models import (
+    ImageBlob, ImportCheckpoint, Recipe, Tag, VersionStamp
+)
 
 
 class dbTest(TestCase):
@@ -19,3 +30,283 @@ class dbTest(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+
+class ImportRecipesTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, content):
+        """Write an input file and return its path"""
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def call(self, path, **options):
+        """Run the import and return its output"""
+        out = StringIO()
+        call_command(
+            'import_recipes', path, user=self.user.email,
+            stdout=out, stderr=out, **options
+        )
+        return out.getvalue()
+
+    def test_import_csv(self):
+        """Test importing recipes with tag and ingredient names"""
+        Tag.objects.create(user=self.user, name="veg")
+        path = self.write('recipes.csv', (
+            "name,time_took_min,price,url,tags,ingredients\n"
+            "Dal,20,3.50,,veg|quick,lentils\n"
+            "Rice,15,1,https://example.com,veg,\n"
+        ))
+        self.call(path)
+        dal = Recipe.objects.get(name="Dal")
+        self.assertEqual(dal.user, self.user)
+        self.assertEqual(dal.price, Decimal('3.50'))
+        self.assertEqual(
+            sorted(dal.tags.values_list('name', flat=True)), ['quick', 'veg']
+        )
+        self.assertEqual(list(dal.ingredients.values_list('name', flat=True)),
+                         ['lentils'])
+        rice = Recipe.objects.get(name="Rice")
+        self.assertEqual(rice.url, 'https://example.com')
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_other_owners_notified(self):
+        """Test that names of other users' tags bump their stamps"""
+        owner = get_user_model().objects.create_user(
+            email="owner@gmail.com",
+            name="owner",
+            password="testpassword"
+        )
+        Tag.objects.create(user=owner, name="veg")
+        version = VersionStamp.objects.get(user=owner).version
+        self.call(self.write('recipes.csv', (
+            "name,time_took_min,price,url,tags,ingredients\n"
+            "Dal,20,3.50,,veg,\n"
+        )))
+        self.assertGreater(VersionStamp.objects.get(user=owner).version,
+                           version)
+
+    def test_import_ndjson_skips_invalid(self):
+        """Test that invalid records are reported and skipped"""
+        path = self.write('recipes.ndjson', (
+            '{"name": "Dal", "time_took_min": 20, "price": "3.5"}\n'
+            '{"name": "Bad", "price": "x"}\n'
+            '{"name": "Soup", "time_took_min": 5, "price": 2,'
+            ' "tags": ["warm"]}\n'
+        ))
+        out = self.call(path)
+        self.assertIn('Record 2', out)
+        self.assertIn('Imported 2 recipes, skipped 1', out)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('name', flat=True)),
+            ['Dal', 'Soup']
+        )
+
+    def test_malformed_json(self):
+        """Test that a line of broken JSON is rejected, not fatal"""
+        path = self.write('recipes.ndjson', (
+            '{"name": "Dal", "time_took_min": 20, "price": "3.5"}\n'
+            '{"name": "Bad", \n'
+            '{"name": "Soup", "time_took_min": 5, "price": 2}\n'
+        ))
+        out = self.call(path, batch_size=2)
+        self.assertIn('Line 2 is not valid JSON', out)
+        self.assertIn('Imported 2 recipes, skipped 1', out)
+        self.assertEqual(
+            ImportCheckpoint.objects.get(source=path).position, 3
+        )
+
+    def test_malformed_records(self):
+        """Test that non-objects and names that aren't lists are rejected"""
+        path = self.write('recipes.ndjson', (
+            '["Dal", 20, "3.5"]\n'
+            '"Dal"\n'
+            '{"name": "Salty", "time_took_min": 1, "price": 1,'
+            ' "tags": "salt"}\n'
+            '{"name": "Five", "time_took_min": 1, "price": 1,'
+            ' "ingredients": 5}\n'
+            '{"name": "Long", "time_took_min": 1, "price": 1,'
+            ' "tags": ["%s"]}\n'
+            '{"name": "Soup", "time_took_min": 5, "price": 2,'
+            ' "tags": ["warm"], "ingredients": null}\n'
+        ) % ('x' * 256))
+        out = self.call(path)
+        self.assertIn('Record 1: ', out)
+        self.assertIn('Record must be an object.', out)
+        self.assertIn('Record 3: ', out)
+        self.assertIn('Record 4: ', out)
+        self.assertIn('Record 5: ', out)
+        self.assertIn('Imported 1 recipes, skipped 5', out)
+        self.assertEqual(list(Tag.objects.values_list('name', flat=True)),
+                         ['warm'])
+
+    def test_resume_after_failure(self):
+        """Test that a failed import resumes after its last batch"""
+        path = self.write('recipes.ndjson', ''.join(
+            f'{{"name": "r{i}", "time_took_min": 1, "price": 1}}\n'
+            for i in range(5)
+        ))
+        original = importer.import_batch
+        calls = []
+
+        def failing_batch(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OperationalError
+            return original(*args)
+
+        with patch('core.management.commands.import_recipes.import_batch',
+                   side_effect=failing_batch):
+            with self.assertRaises(OperationalError):
+                self.call(path, batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        out = self.call(path, batch_size=2)
+        self.assertIn('Resuming after record 2', out)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('name', flat=True)),
+            [f'r{i}' for i in range(5)]
+        )
+        self.call(path, batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 5)
+        self.call(path, batch_size=2, restart=True)
+        self.assertEqual(Recipe.objects.count(), 10)
+
+
+class RecountRecipesTest(TestCase):
+    def test_recount(self):
+        """Test that drifted counts are recomputed"""
+        user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        tag = Tag.objects.create(user=user, name="veg")
+        recipe = Recipe.objects.create(
+            user=user, name="Dal", time_took_min=20, price=3
+        )
+        recipe.tags.add(tag)
+        Tag.objects.update(recipe_count=7)
+        version = VersionStamp.objects.get(user=user).version
+        out = StringIO()
+        call_command('recount_recipes', stdout=out)
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+        # The owner's cached tag lists showed the drifted count
+        self.assertGreater(VersionStamp.objects.get(user=user).version,
+                           version)
+        self.assertIn('tags: 1 fixed', out.getvalue())
+
+
+class BuildImageVariantsTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                user=user, name=f"recipe {i}", time_took_min=5, price=1
+            )
+            for i in range(3)
+        ]
+        for recipe in self.recipes[:2]:
+            recipe.image.save('photo.jpg', ContentFile(jpeg()))
+
+    @override_settings(RECIPE_IMAGE_WORKERS=1)
+    def test_backfill(self):
+        """Test that images without variants get them on the pool"""
+        out = StringIO()
+        call_command('build_image_variants', batch_size=1, stdout=out)
+        self.assertIn('2 rendered, 0 failed', out.getvalue())
+        self.assertEqual(Recipe.objects.exclude(image_variants='').count(), 2)
+
+        out = StringIO()
+        call_command('build_image_variants', stdout=out)
+        self.assertNotIn('rendered', out.getvalue())
+
+    # Blob storage refuses files that aren't images, older ones remain
+    @override_settings(
+        RECIPE_IMAGE_WORKERS=0, RECIPE_IMAGE_CONTENT_ADDRESSED=False
+    )
+    def test_broken_image(self):
+        """Test that unreadable images are reported and skipped"""
+        self.recipes[0].image.save('photo.jpg', ContentFile(b'not an image'))
+        out, err = StringIO(), StringIO()
+        call_command('build_image_variants', stdout=out, stderr=err)
+        self.assertIn('1 rendered, 1 failed', out.getvalue())
+        self.assertIn(f'Recipe {self.recipes[0].id}', err.getvalue())
+
+
+class DedupeImagesTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name, RECIPE_IMAGE_CONTENT_ADDRESSED=False,
+            RECIPE_IMAGE_BLOB_GRACE=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.recipes = []
+        for size in (10, 10, 20):
+            recipe = Recipe.objects.create(
+                user=user, name="Dal", time_took_min=5, price=1
+            )
+            recipe.image.save('photo.jpg', ContentFile(jpeg((size, size))))
+            self.recipes.append(recipe)
+        self.variants = os.path.join(media.name, 'uploads/recipe/variants')
+        os.makedirs(os.path.join(
+            self.variants, self.recipes[0].image.name[15:-4]
+        ))
+        Recipe.objects.filter(pk=self.recipes[0].pk).update(
+            image_variants=f'uploads/recipe/variants/'
+            f'{self.recipes[0].image.name[15:-4]}'
+        )
+
+    def test_dedupe(self):
+        """Test that existing images are stored once per content"""
+        old_paths = [recipe.image.path for recipe in self.recipes]
+        out = StringIO()
+        with self.settings(RECIPE_IMAGE_CONTENT_ADDRESSED=True):
+            call_command('dedupe_images', stdout=out)
+        self.assertIn('3 images moved into blobs', out.getvalue())
+        names = [recipe.image.name for recipe in Recipe.objects.all()]
+        self.assertEqual(names[0], names[1])
+        self.assertNotEqual(names[0], names[2])
+        self.assertEqual(
+            sorted(ImageBlob.objects.values_list('refs', flat=True)), [1, 2]
+        )
+        self.assertFalse(any(os.path.exists(path) for path in old_paths))
+        first = Recipe.objects.get(pk=self.recipes[0].pk)
+        self.assertTrue(first.image_variants.endswith(
+            os.path.splitext(os.path.basename(first.image.name))[0]
+        ))
+        self.assertEqual(os.listdir(self.variants), [
+            os.path.basename(first.image_variants)
+        ])
+
+    def test_needs_mode(self):
+        """Test that the command refuses to run without the mode"""
+        with self.assertRaises(CommandError):
+            call_command('dedupe_images', stdout=StringIO())
@@ -0,0 +1,92 @@
+import threading
+from unittest import mock
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import hashing, metrics
+
+TOKEN_URL = reverse('user:token')
+
+
+class FewIterationsHasher(PBKDF2PasswordHasher):
+    iterations = 1000
+
+
+class MoreIterationsHasher(PBKDF2PasswordHasher):
+    iterations = 2000
+
+
+class HashingPoolTest(TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_run(self):
+        """Test that work runs on the pool and is measured"""
+        pool = hashing.HashingPool(threads=1, queue=0, timeout=1)
+        self.assertEqual(pool.run(threading.current_thread).name[:16],
+                         'password-hashing')
+        counters = metrics.snapshot()
+        self.assertEqual(counters['password_hashing.count'], 1)
+        self.assertEqual(counters['password_hashing.queue_depth'], 0)
+        self.assertIn('password_hashing.seconds', counters)
+
+    def test_back_pressure(self):
+        """Test that callers are refused once threads and queue are full"""
+        pool = hashing.HashingPool(threads=1, queue=0, timeout=0)
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+        thread = threading.Thread(target=pool.run, args=(block,))
+        thread.start()
+        started.wait()
+        with self.assertRaises(hashing.HashingBusy) as busy:
+            pool.run(int)
+        self.assertEqual(busy.exception.wait, 1)
+        release.set()
+        thread.join()
+        self.assertEqual(pool.run(int), 0)
+        self.assertEqual(metrics.snapshot()['password_hashing.rejected'], 1)
+
+
+class PasswordTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.credential = {
+            'email': "ycv005@gmail.com",
+            'password': "@P1q2w3e4r"
+        }
+
+    @override_settings(PASSWORD_HASHERS=[
+        'core.tests.test_hashing.FewIterationsHasher'
+    ])
+    def test_rehash_on_login(self):
+        """Test that logging in upgrades a hash with outdated iterations"""
+        user = get_user_model().objects.create_user(
+            name="yash", **self.credential
+        )
+        self.assertIn('$1000$', user.password)
+        with self.settings(PASSWORD_HASHERS=[
+            'core.tests.test_hashing.MoreIterationsHasher'
+        ]):
+            res = self.client.post(TOKEN_URL, self.credential)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            user.refresh_from_db()
+            self.assertIn('$2000$', user.password)
+            with self.assertNumQueries(0):
+                self.assertTrue(user.check_password(
+                    self.credential['password']
+                ))
+
+    def test_busy(self):
+        """Test that a login is refused with 503 while hashing is busy"""
+        get_user_model().objects.create_user(name="yash", **self.credential)
+        busy = hashing.HashingBusy(wait=5)
+        with mock.patch.object(hashing, 'check_password', side_effect=busy):
+            res = self.client.post(TOKEN_URL, self.credential)
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '5')
@@ -0,0 +1,211 @@
+import os
+import tempfile
+import time
+from unittest import skipUnless
+from django.test import SimpleTestCase, override_settings
+from django.test.client import RequestFactory
+from django.urls import reverse
+from django.views.static import serve
+from django.utils.http import http_date
+from core.views import serve_media
+
+CONTENT = bytes(range(256)) * 40
+
+
+class ServeMediaTest(SimpleTestCase):
+    """Test serving media files"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        os.makedirs(os.path.join(media.name, 'uploads'))
+        self.path = os.path.join(media.name, 'uploads', 'photo.jpg')
+        with open(self.path, 'wb') as file:
+            file.write(CONTENT)
+        self.url = reverse('media', args=['uploads/photo.jpg'])
+
+    def test_full(self):
+        """Test that a file is served with its validators"""
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertEqual(res['Cache-Control'], 'public, max-age=86400')
+        self.assertEqual(res['Last-Modified'],
+                         http_date(os.path.getmtime(self.path)))
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertEqual(res['X-Content-Type-Options'], 'nosniff')
+        self.assertNotIn('Content-Disposition', res)
+
+    def test_download(self):
+        """Test that files other than raster images are downloads"""
+        for name in ('page.html', 'drawing.svg', 'notes'):
+            with open(os.path.join(os.path.dirname(self.path), name),
+                      'wb') as file:
+                file.write(b'<script>alert(1)</script>')
+            res = self.client.get(f'/media/uploads/{name}')
+            self.assertEqual(res.status_code, 200, name)
+            self.assertEqual(res['Content-Disposition'], 'attachment')
+            self.assertEqual(res['X-Content-Type-Options'], 'nosniff')
+
+    def test_private(self):
+        """Test that partial uploads are never served"""
+        directory = os.path.join(os.path.dirname(self.path), 'partial')
+        os.makedirs(directory)
+        with open(os.path.join(directory, 'upload.part'), 'wb') as file:
+            file.write(CONTENT)
+        for path in ('uploads/partial/upload.part',
+                     'uploads/other/../partial/upload.part'):
+            res = self.client.get(f'/media/{path}')
+            self.assertEqual(res.status_code, 404, path)
+
+    def test_head(self):
+        """Test that HEAD sends the headers only"""
+        res = self.client.head(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+
+    def test_missing(self):
+        """Test that missing files and paths out of the root are 404"""
+        for path in ('uploads/other.jpg', 'uploads', '../etc/passwd'):
+            res = self.client.get(f'/media/{path}')
+            self.assertEqual(res.status_code, 404, path)
+
+    def test_not_modified(self):
+        """Test that matching validators are answered with 304"""
+        etag = self.client.get(self.url)['ETag']
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+        res = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(res.status_code, 304)
+        res = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(
+            time.time() - 3600
+        ))
+        self.assertEqual(res.status_code, 200)
+
+    def test_changed(self):
+        """Test that the ETag changes with the file"""
+        etag = self.client.get(self.url)['ETag']
+        with open(self.path, 'ab') as file:
+            file.write(b'more')
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_ranges(self):
+        """Test that single byte ranges are answered with 206"""
+        size = len(CONTENT)
+        cases = {
+            'bytes=0-99': (0, 99),
+            'bytes=100-': (100, size - 1),
+            'bytes=-50': (size - 50, size - 1),
+            'bytes=10000-99999': (10000, size - 1),
+        }
+        for header, (first, last) in cases.items():
+            res = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(res.status_code, 206, header)
+            self.assertEqual(res['Content-Range'],
+                             f'bytes {first}-{last}/{size}')
+            self.assertEqual(res['Content-Length'], str(last - first + 1))
+            self.assertEqual(b''.join(res.streaming_content),
+                             CONTENT[first:last + 1])
+
+    def test_ignored_ranges(self):
+        """Test that malformed and multiple ranges get the whole file"""
+        for header in ('bytes=0-1,5-6', 'lines=1-2', 'bytes=9-3'):
+            res = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(res.status_code, 200, header)
+
+    def test_unsatisfiable_range(self):
+        """Test that ranges past the end are answered with 416"""
+        res = self.client.get(self.url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_if_range(self):
+        """Test that a stale If-Range gets the whole file"""
+        etag = self.client.get(self.url)['ETag']
+        res = self.client.get(self.url, HTTP_RANGE='bytes=0-9',
+                              HTTP_IF_RANGE=etag)
+        self.assertEqual(res.status_code, 206)
+        res = self.client.get(self.url, HTTP_RANGE='bytes=0-9',
+                              HTTP_IF_RANGE='"stale"')
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE='X-Accel-Redirect')
+    def test_accel_redirect(self):
+        """Test that nginx is told to send the file"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['X-Accel-Redirect'],
+                         '/protected-media/uploads/photo.jpg')
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('ETag', res)
+
+    @override_settings(MEDIA_SENDFILE='X-Sendfile')
+    def test_sendfile(self):
+        """Test that Apache is told to send the file"""
+        res = self.client.get(self.url)
+        self.assertEqual(res['X-Sendfile'], self.path)
+        self.assertEqual(res.content, b'')
+
+    def test_post(self):
+        """Test that only safe methods are allowed"""
+        res = self.client.post(self.url)
+        self.assertEqual(res.status_code, 405)
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'Set BENCHMARK=1 to run')
+class ServeMediaBenchmark(SimpleTestCase):
+    """Compare serve_media with the view static() routed media to"""
+    rounds = 200
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.root = media.name
+        with open(os.path.join(self.root, 'photo.jpg'), 'wb') as file:
+            file.write(os.urandom(4 * 1024 * 1024))
+        self.factory = RequestFactory()
+
+    def cost(self, view, **headers):
+        """Return the mean seconds to answer and send a request"""
+        request = self.factory.get('/media/photo.jpg', **headers)
+        start = time.perf_counter()
+        for _ in range(self.rounds):
+            response = view(request, 'photo.jpg', document_root=self.root)
+            for _ in response:
+                pass
+            response.close()
+        return (time.perf_counter() - start) / self.rounds
+
+    def test_cost(self):
+        """Test that ranges and revalidation skip reading the file"""
+        etag = serve_media(
+            self.factory.get('/media/photo.jpg'), 'photo.jpg',
+            document_root=self.root
+        )['ETag']
+        cases = {
+            'full': {},
+            'range': {'HTTP_RANGE': 'bytes=0-65535'},
+            'revalidate': {'HTTP_IF_NONE_MATCH': etag},
+        }
+        print()
+        for name, headers in cases.items():
+            old = self.cost(serve, **headers)
+            new = self.cost(serve_media, **headers)
+            print(f"{name}: static() {old * 1e6:.0f} us, "
+                  f"serve_media {new * 1e6:.0f} us")
+            if name != 'full':
+                self.assertLess(new, old)
+        with self.settings(MEDIA_SENDFILE='X-Accel-Redirect'):
+            offloaded = self.cost(serve_media)
+        print(f"full, X-Accel-Redirect: {offloaded * 1e6:.0f} us")
@@ -0,0 +1,39 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import metrics
+
+METRICS_URL = reverse('metrics')
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        metrics.reset()
+
+    def test_counters(self):
+        """Test that increments are reported per name"""
+        metrics.increment('a')
+        metrics.increment('a', 2)
+        metrics.increment('b')
+        self.assertEqual(metrics.snapshot(), {'a': 3, 'b': 1})
+
+    def test_staff_only(self):
+        """Test that only staff users can read the counters"""
+        user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(user)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.staff = True
+        user.save()
+        metrics.reset()
+        metrics.increment('a')
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.data, {'a': 1})
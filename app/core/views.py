@@ -1,3 +1,103 @@
-from django.shortcuts import render
+from urllib.parse import quote
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from rest_framework import authentication, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core import media, metrics
 
-# Create your views here.
+
+class MetricsView(APIView):
+    """Return the counters of this process to staff users"""
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """Return a snapshot of the counters"""
+        return Response(metrics.snapshot())
+
+
+@require_safe
+def serve_media(request, path, document_root=None, cache_control=None):
+    """Serve a media file with validators, byte ranges and offloading
+
+    Answers If-None-Match and If-Modified-Since with 304 and a single
+    Range with 206. With MEDIA_SENDFILE set the body is left to the
+    front proxy, which then also serves the ranges. Only the raster
+    image types are shown inline, anything else is a download.
+    """
+    full_path, stat = media.media_file(path, document_root)
+    etag = media.file_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+    content_type, encoding = media.content_type(full_path)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': last_modified,
+        'Cache-Control': cache_control or (
+            f'public, max-age={settings.MEDIA_MAX_AGE}'
+        ),
+        'Accept-Ranges': 'bytes',
+        **media.safety_headers(content_type),
+    }
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    validators = HttpResponse()
+    for name, value in headers.items():
+        validators[name] = value
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime),
+        response=validators
+    )
+    if conditional is not validators:
+        metrics.increment('media.not_modified')
+        return conditional
+
+    first, last = 0, stat.st_size - 1
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if settings.MEDIA_SENDFILE or if_range not in (None, etag, last_modified):
+        byte_range = None
+    else:
+        try:
+            byte_range = media.parse_range(
+                request.META.get('HTTP_RANGE'), stat.st_size
+            )
+        except ValueError:
+            response = HttpResponse(status=416, content_type=content_type)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            response['X-Content-Type-Options'] = 'nosniff'
+            return response
+
+    if settings.MEDIA_SENDFILE:
+        metrics.increment('media.offloaded')
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_SENDFILE == 'X-Accel-Redirect':
+            response['X-Accel-Redirect'] = quote(
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+            )
+        else:
+            response[settings.MEDIA_SENDFILE] = full_path
+    elif request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        if byte_range is not None:
+            first, last = byte_range
+        response = StreamingHttpResponse(
+            media.read_range(full_path, first, last - first + 1),
+            content_type=content_type
+        )
+        if byte_range is not None:
+            metrics.increment('media.partial')
+            response.status_code = 206
+            response['Content-Range'] = (
+                f'bytes {first}-{last}/{stat.st_size}'
+            )
+        metrics.increment('media.bytes', last - first + 1)
+    for name, value in headers.items():
+        response[name] = value
+    if not settings.MEDIA_SENDFILE:
+        response['Content-Length'] = last - first + 1
+    return response
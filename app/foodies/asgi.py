@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodies.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once the apps are loaded by get_asgi_application()
+from recipe.asgi import RecipeReadApplication  # noqa: E402
+
+application = RecipeReadApplication(django_application)
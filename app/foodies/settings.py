@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -89,6 +90,23 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# Local memory by default; point CACHE_BACKEND and CACHE_LOCATION at a
+# shared backend (e.g. memcached) so all workers share the entries.
+
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', LOCMEM_CACHE),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        'TIMEOUT': 300,
+    }
+}
+# Memcached backends pass OPTIONS to their client, which rejects this
+if CACHES['default']['BACKEND'] == LOCMEM_CACHE:
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -130,4 +148,114 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = 'vol/web/media'
-STATIC_ROOT = 'vol/web/static'
\ No newline at end of file
+STATIC_ROOT = 'vol/web/static'
+
+# Recipe filtering
+# Answer ?tags= / ?ingredients= filters from an in-process inverted index
+# per user instead of SQL joins. The index is kept per process and dropped
+# through the recipes_changed signal, so enable it only where all writes go
+# through this process or short staleness is acceptable.
+
+RECIPE_FILTER_INDEX = False
+RECIPE_FILTER_INDEX_MAX_USERS = 1000
+
+# Tag and ingredient autocomplete
+# Served from a per-process prefix index per user, dropped on create,
+# rename and delete through the recipes_changed signal. Writes made by
+# other processes only show up once the index is older than the TTL in
+# seconds, so lower it where several workers serve the same users.
+
+RECIPE_AUTOCOMPLETE_MAX_USERS = 1000
+RECIPE_AUTOCOMPLETE_TTL = 30
+RECIPE_AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Largest list accepted by the bulk recipe endpoint
+RECIPE_BULK_MAX_ITEMS = 500
+
+# Recipe search
+# Fall back to trigram similarity when full-text search finds nothing.
+# Needs the pg_trgm extension, which the 0007 recipe migration installs
+# where the server provides it.
+
+RECIPE_SEARCH_TRIGRAM = True
+
+# Recipe response cache
+# Alias in CACHES holding the list and detail response data of the recipe
+# views, or None to disable. Entries are keyed by the user's version
+# stamp, so a change makes them unreachable and they age out by TTL/LRU.
+
+RECIPE_RESPONSE_CACHE = 'default'
+RECIPE_RESPONSE_CACHE_TIMEOUT = 60
+
+# Recipes read per server-side cursor fetch by the export action
+RECIPE_EXPORT_CHUNK_SIZE = 2000
+
+# Recipe stats
+# Sections of the stats are cached per user in the RECIPE_STATS_CACHE
+# alias (None disables) and dropped one by one through recipes_changed;
+# the timeout bounds staleness from writes racing a recomputation.
+
+RECIPE_STATS_CACHE = 'default'
+RECIPE_STATS_CACHE_TIMEOUT = 600
+RECIPE_STATS_HISTOGRAM_BUCKETS = 10
+RECIPE_STATS_TOP = 10
+
+# Threads running the ORM for the async recipe read path in foodies/asgi.py,
+# at most the number of database connections a process may open
+RECIPE_ASYNC_DB_THREADS = 20
+
+# CachedTokenAuthentication: a per-process LRU of token keys to users,
+# optionally backed by a cache alias shared by the processes (or None)
+TOKEN_AUTH_CACHE_MAX_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 60
+TOKEN_AUTH_SHARED_CACHE = 'default'
+TOKEN_AUTH_SHARED_CACHE_TIMEOUT = 300
+
+# Signed access tokens (user/tokens.py): key id -> secret. New tokens are
+# signed with SIGNED_TOKEN_CURRENT_KEY; to rotate, add a key and make it
+# current, then drop the old one after SIGNED_TOKEN_REFRESH_LIFETIME
+SIGNED_TOKEN_KEYS = {'k1': SECRET_KEY}
+SIGNED_TOKEN_CURRENT_KEY = 'k1'
+SIGNED_TOKEN_ACCESS_LIFETIME = 300
+SIGNED_TOKEN_REFRESH_LIFETIME = 24 * 60 * 60
+
+# Password hashing runs on a per-process pool of this many threads; up to
+# PASSWORD_HASHING_QUEUE more hashes wait for one, and further requests
+# wait PASSWORD_HASHING_TIMEOUT seconds for room before a 503. Waiting
+# holds a request worker, so by default they are refused right away.
+PASSWORD_HASHING_THREADS = 2
+PASSWORD_HASHING_QUEUE = 16
+PASSWORD_HASHING_TIMEOUT = 0
+
+# Resized copies of uploaded recipe images: name -> longest side in
+# pixels, each written in every format. Rendered by a pool of this many
+# processes, or in the request when RECIPE_IMAGE_WORKERS is 0
+RECIPE_IMAGE_VARIANTS = {'thumb': 160, 'medium': 640, 'large': 1280}
+RECIPE_IMAGE_FORMATS = ('webp', 'jpeg')
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_WORKERS = 2
+# Largest image accepted, checked from the header before any decoding;
+# the largest in bytes is RECIPE_UPLOAD_MAX_SIZE
+RECIPE_IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+
+# Chunked image uploads (recipe/uploads.py): largest image and chunk in
+# bytes, and seconds after the last chunk when an upload is dropped
+RECIPE_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+RECIPE_UPLOAD_MAX_CHUNK = 5 * 1024 * 1024
+RECIPE_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Store recipe images once per content under their SHA-256 (see
+# recipe/storage.py); dedupe_images moves existing ones and deletes blobs
+# unreferenced and untouched for RECIPE_IMAGE_BLOB_GRACE seconds
+RECIPE_IMAGE_CONTENT_ADDRESSED = True
+RECIPE_IMAGE_BLOB_GRACE = 60 * 60
+
+# Media files (core.views.serve_media): seconds browsers may cache them,
+# and the header handing the body to the front proxy, '' to send it from
+# Django. 'X-Accel-Redirect' (nginx) points at the internal location
+# MEDIA_ACCEL_REDIRECT_PREFIX, 'X-Sendfile' (Apache) at the file itself
+MEDIA_MAX_AGE = 24 * 60 * 60
+MEDIA_SENDFILE = ''
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# Directories under MEDIA_ROOT never served, e.g. partial uploads
+MEDIA_PRIVATE_DIRS = ('uploads/partial',)
@@ -15,11 +15,17 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
+from core.views import MetricsView, serve_media
+from recipe.storage import BLOB_DIR
+from recipe.views import image_blob
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls'), name='user'),
     path('api/recipe/', include('recipe.urls'), name='recipe'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path(f'{settings.MEDIA_URL[1:]}{BLOB_DIR}/<path:path>', image_blob,
+         name='image-blob'),
+    path(f'{settings.MEDIA_URL[1:]}<path:path>', serve_media, name='media'),
+]
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        """Connect the signal receivers"""
+        from . import (  # noqa
+            signals, counts, index, autocomplete, conditional, stats, blobs
+        )
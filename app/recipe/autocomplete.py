@@ -0,0 +1,62 @@
+from bisect import bisect_left
+from django.conf import settings
+from django.dispatch import receiver
+from .index import IndexRegistry
+from .models import Tag, Ingredient
+from .signals import recipes_changed
+
+MODELS = {model._meta.model_name: model for model in (Tag, Ingredient)}
+
+
+class PrefixIndex:
+    """Case-insensitive prefix lookup over the names of a user's objects
+
+    Names are kept sorted by their folded form, so the matches of a
+    prefix are a contiguous run found with one binary search.
+    """
+
+    def __init__(self, rows):
+        self.entries = sorted(
+            (name.casefold(), name, pk) for pk, name in rows
+        )
+        self.keys = [entry[0] for entry in self.entries]
+
+    @classmethod
+    def build(cls, key):
+        """Build the index of (model name, user id) with one query"""
+        model_name, user_id = key
+        rows = MODELS[model_name].objects.filter(
+            user_id=user_id
+        ).values_list('id', 'name')
+        return cls(rows)
+
+    def complete(self, prefix, limit):
+        """Return up to `limit` (id, name) pairs starting with prefix"""
+        prefix = prefix.casefold()
+        matches = []
+        start = bisect_left(self.keys, prefix)
+        for key, name, pk in self.entries[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            matches.append({'id': pk, 'name': name})
+        return matches
+
+
+registry = IndexRegistry(
+    PrefixIndex.build, settings.RECIPE_AUTOCOMPLETE_MAX_USERS,
+    settings.RECIPE_AUTOCOMPLETE_TTL
+)
+
+
+def complete(model, user_id, prefix, limit):
+    """Return the names of the user's tags or ingredients with a prefix"""
+    index = registry.get((model._meta.model_name, user_id))
+    return index.complete(prefix, limit)
+
+
+@receiver(recipes_changed)
+def invalidate_prefix_index(sender, user_ids, **kwargs):
+    """Drop the prefix index when tags or ingredients change"""
+    if sender in (Tag, Ingredient):
+        model_name = sender._meta.model_name
+        registry.invalidate((model_name, user_id) for user_id in user_ids)
@@ -0,0 +1,132 @@
+import os
+import shutil
+import time
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .images import variants_dir
+from .models import ImageBlob, Recipe
+from .storage import BLOB_DIR, blob_digest
+
+# Cache-Control of blob responses, their content never changes
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Stands for the stored image of a recipe loaded without that column
+UNKNOWN = object()
+
+
+def adjust_refs(name, delta):
+    """Add delta to the reference count of the blob stored as name"""
+    digest = blob_digest(name)
+    if digest is None or not delta:
+        return
+    blobs = ImageBlob.objects.filter(pk=digest)
+    if blobs.update(refs=F('refs') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            ImageBlob.objects.create(digest=digest, name=name, refs=delta)
+    except IntegrityError:
+        # Created by a concurrent upload of the same bytes
+        blobs.update(refs=F('refs') + delta)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(sender, instance, **kwargs):
+    """Keep the image name a recipe was loaded with"""
+    instance._stored_image = instance.__dict__.get('image', UNKNOWN)
+
+
+@receiver(post_save, sender=Recipe)
+def count_image_refs(sender, instance, update_fields=None, **kwargs):
+    """Move a reference from the recipe's old image blob to its new one"""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if instance._stored_image is UNKNOWN:
+        return
+    old = getattr(instance._stored_image, 'name', instance._stored_image)
+    new = instance.image.name
+    if old != new:
+        adjust_refs(new, 1)
+        adjust_refs(old, -1)
+        instance._stored_image = new
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image(sender, instance, **kwargs):
+    """Drop the reference of a deleted recipe to its image blob"""
+    adjust_refs(instance.image.name, -1)
+
+
+def collect_blobs(storage, grace):
+    """Delete unreferenced blobs untouched for grace seconds
+
+    Saving bytes that are already stored touches the blob file, so a
+    blob uploaded again while unreferenced survives until the upload
+    takes its reference. Blob files without a row, left by failed
+    requests, go too. Returns the number of files deleted.
+    """
+    cutoff = time.time() - grace
+    deleted = 0
+    for blob in ImageBlob.objects.filter(refs__lte=0).iterator():
+        path = storage.path(blob.name)
+        with transaction.atomic():
+            locked = ImageBlob.objects.select_for_update().filter(
+                pk=blob.pk, refs__lte=0
+            ).first()
+            if locked is None:
+                continue
+            if os.path.exists(path) and os.path.getmtime(path) > cutoff:
+                continue
+            locked.delete()
+        if os.path.exists(path):
+            os.remove(path)
+            deleted += 1
+        shutil.rmtree(storage.path(variants_dir(blob.name)), True)
+
+    known = set(ImageBlob.objects.values_list('digest', flat=True))
+    for directory, _, files in os.walk(storage.path(BLOB_DIR)):
+        for file in files:
+            path = os.path.join(directory, file)
+            digest = os.path.splitext(file)[0]
+            if digest not in known and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                deleted += 1
+    return deleted
+
+
+def recount_refs():
+    """Set the reference count of every blob from the recipes"""
+    refs = Recipe.objects.filter(image=OuterRef('name')).order_by().values(
+        'image'
+    ).annotate(count=Count('id')).values('count')
+    return ImageBlob.objects.update(refs=Coalesce(Subquery(refs), 0))
+
+
+def dedupe_image(recipe, storage):
+    """Move a recipe's image into blob storage
+
+    Returns the name of the file left behind, or None when the image
+    already is a blob. Rendered variants move along with the image.
+    """
+    old = recipe.image.name
+    if not old or blob_digest(old) is not None:
+        return None
+    with storage.open(old, 'rb') as file:
+        new = storage.save(old, file)
+    if recipe.image_variants:
+        source = storage.path(recipe.image_variants)
+        target = storage.path(variants_dir(new))
+        if os.path.isdir(source) and not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.rename(source, target)
+        else:
+            shutil.rmtree(source, True)
+        # Left for build_image_variants when neither copy existed
+        recipe.image_variants = (
+            variants_dir(new) if os.path.isdir(target) else ''
+        )
+    recipe.image.name = new
+    recipe.save(update_fields=['image', 'image_variants'])
+    return old
@@ -0,0 +1,193 @@
+from collections import Counter
+from django.db import connection, transaction
+from rest_framework.relations import PrimaryKeyRelatedField
+from .counts import adjust_counts, through_counts
+from .models import Tag, Ingredient, Recipe
+from .serializers import RecipeBulkItemSerializer
+from .signals import attribute_owners, notify
+
+DOES_NOT_EXIST = PrimaryKeyRelatedField.default_error_messages[
+    'does_not_exist'
+]
+RELATIONS = (
+    ('tags', Tag, Recipe.tags.through, 'tag_id'),
+    ('ingredients', Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+)
+
+
+def _validate(user, items):
+    """Validate the items, returning (index, data) pairs and errors
+
+    Also returns the recipes updated by id and the owner of each
+    referenced tag and ingredient per relation field.
+    """
+    valid, errors = [], {}
+    for i, item in enumerate(items):
+        partial = isinstance(item, dict) and 'id' in item
+        serializer = RecipeBulkItemSerializer(data=item, partial=partial)
+        if serializer.is_valid():
+            valid.append((i, serializer.validated_data))
+        else:
+            errors[i] = serializer.errors
+
+    # One query per relation and one for the recipes being updated
+    existing = {}
+    for field, model, _, _ in RELATIONS:
+        ids = {pk for _, data in valid for pk in data.get(field, [])}
+        existing[field] = dict(model.objects.filter(
+            id__in=ids
+        ).order_by().values_list('id', 'user_id'))
+    update_ids = {data['id'] for _, data in valid if 'id' in data}
+    recipes = Recipe.objects.filter(user=user, id__in=update_ids).in_bulk()
+
+    checked, first = [], {}
+    for i, data in valid:
+        item_errors = {}
+        for field, _, _, _ in RELATIONS:
+            missing = [pk for pk in data.get(field, [])
+                       if pk not in existing[field]]
+            if missing:
+                item_errors[field] = [
+                    DOES_NOT_EXIST.format(pk_value=pk) for pk in missing
+                ]
+        if 'id' in data and data['id'] not in recipes:
+            item_errors['id'] = ['Not found.']
+        elif 'id' in data and data['id'] in first:
+            # One recipe can only be updated once per batch
+            item_errors['id'] = [
+                'Repeats the id of item {}.'.format(first[data['id']])
+            ]
+        elif 'id' in data:
+            first[data['id']] = i
+        if item_errors:
+            errors[i] = item_errors
+        else:
+            checked.append((i, data))
+    return checked, errors, recipes, existing
+
+
+def save_recipes(user, items):
+    """Create or update a list of recipes of user in one transaction
+
+    Items with an `id` update that recipe with the given fields, the
+    others create a new one. Returns a tuple of the saved recipe id per
+    item index and the validation errors per item index; invalid items
+    are skipped without failing the others.
+    """
+    checked, errors, recipes, attr_owners = _validate(user, items)
+    scalar_fields = [
+        name for name in RecipeBulkItemSerializer.Meta.fields
+        if name not in ('id', 'tags', 'ingredients')
+    ]
+    created, updated = [], []
+    for i, data in checked:
+        values = {k: v for k, v in data.items() if k in scalar_fields}
+        if 'id' in data:
+            recipe = recipes[data['id']]
+            for key, value in values.items():
+                setattr(recipe, key, value)
+            updated.append((i, data, recipe))
+        else:
+            created.append((i, data, Recipe(user=user, **values)))
+
+    with transaction.atomic():
+        new_recipes = [recipe for _, _, recipe in created]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(new_recipes)
+        else:
+            for recipe in new_recipes:
+                recipe.save()
+        if updated:
+            Recipe.objects.bulk_update(
+                [recipe for _, _, recipe in updated], scalar_fields
+            )
+        # Users whose tags or ingredients gained or lost recipes
+        owners = {user.id}
+        for field, model, through, column in RELATIONS:
+            deltas = Counter()
+            replaced = [recipe.id for _, data, recipe in updated
+                        if field in data]
+            if replaced:
+                deltas.subtract(
+                    through_counts(through, recipe_id__in=replaced)
+                )
+                through.objects.filter(recipe_id__in=replaced).delete()
+            rows = [
+                through(recipe_id=recipe.id, **{column: pk})
+                for _, data, recipe in created + updated
+                for pk in set(data.get(field, []))
+            ]
+            through.objects.bulk_create(rows)
+            deltas.update(getattr(row, column) for row in rows)
+            adjust_counts(model, deltas)
+            known = attr_owners[field]
+            owners.update(known[pk] for pk in deltas if pk in known)
+            # Only the relations replaced away weren't looked up yet
+            removed = [pk for pk in deltas if pk not in known]
+            if removed:
+                owners.update(attribute_owners(model, pk__in=removed))
+        if checked:
+            # bulk_create and bulk_update send no model signals
+            notify(Recipe, owners)
+
+    saved = {i: recipe.id for i, _, recipe in created + updated}
+    return saved, errors
+
+
+UPSERT_NAMES_SQL = """
+WITH input AS (
+    SELECT name, ord FROM unnest(%s::varchar[]) WITH ORDINALITY AS t(name, ord)
+), inserted AS (
+    INSERT INTO {table} (name, user_id, recipe_count)
+    SELECT DISTINCT name, %s, 0 FROM input
+    ON CONFLICT (name) DO NOTHING
+    RETURNING id, name
+)
+SELECT coalesce(inserted.id, existing.id), inserted.id IS NOT NULL
+FROM input
+LEFT JOIN inserted ON inserted.name = input.name
+LEFT JOIN {table} existing ON existing.name = input.name
+ORDER BY input.ord
+"""
+
+
+def _upsert_names_postgres(model, user, names):
+    """Resolve or create the names with one INSERT ... ON CONFLICT"""
+    sql = UPSERT_NAMES_SQL.format(
+        table=connection.ops.quote_name(model._meta.db_table)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [names, user.id])
+        rows = cursor.fetchall()
+    return [pk for pk, _ in rows], any(created for _, created in rows)
+
+
+def _upsert_names_generic(model, user, names):
+    """Resolve or create the names with an insert and a select"""
+    model.objects.bulk_create(
+        [model(user=user, name=name) for name in set(names)],
+        ignore_conflicts=True
+    )
+    ids = dict(model.objects.filter(name__in=names).values_list('name', 'id'))
+    return [ids.get(name) for name in names], True
+
+
+def upsert_names(model, user, names):
+    """Return the ids of the tags or ingredients named, in input order
+
+    Missing names are created for user. Names are globally unique, so a
+    name another user already owns resolves to that existing row.
+    """
+    if connection.vendor == 'postgresql':
+        upsert = _upsert_names_postgres
+    else:
+        upsert = _upsert_names_generic
+    ids, created = upsert(model, user, names)
+    if None in ids:
+        # A concurrent insert committed after our statement started and is
+        # not in its snapshot yet; a new statement sees it
+        ids, retry_created = upsert(model, user, names)
+        created = created or retry_created
+    if created:
+        notify(model, [user.id])
+    return ids
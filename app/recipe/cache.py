@@ -0,0 +1,60 @@
+from functools import wraps
+from hashlib import md5
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+from core import metrics
+from .conditional import version_stamp
+
+# Comma separated params whose order does not change the response
+SET_PARAMS = ('tags', 'ingredients', 'fields', 'omit')
+
+
+def _normalize(name, value):
+    """Return a param value in a canonical form"""
+    if name in SET_PARAMS:
+        return ','.join(sorted(set(value.split(','))))
+    return value
+
+
+def cache_key(request, action, kwargs):
+    """Return the cache key of a read for the current user
+
+    The key contains the user's version stamp, so any change of their
+    recipes, tags or ingredients moves them to fresh keys. The stamp's
+    modified time is part of it in case a user id is reused.
+    """
+    stamp = version_stamp(request)
+    params = sorted(
+        (name, _normalize(name, value))
+        for name, value in request.query_params.items()
+    )
+    key = repr((
+        stamp.modified.timestamp(), request.get_host(), request.path,
+        action, sorted(kwargs.items()), params
+    ))
+    digest = md5(key.encode()).hexdigest()
+    return f'recipe:{stamp.user_id}:{stamp.version}:{digest}'
+
+
+def cached_response(view_method):
+    """Serve a viewset read from the response cache when possible"""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if settings.RECIPE_RESPONSE_CACHE is None:
+            return view_method(self, request, *args, **kwargs)
+        cache = caches[settings.RECIPE_RESPONSE_CACHE]
+        key = cache_key(request, self.action, kwargs)
+        data = cache.get(key)
+        if data is not None:
+            metrics.increment('recipe_cache.hit')
+            return Response(data)
+        metrics.increment('recipe_cache.miss')
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                key, response.data, settings.RECIPE_RESPONSE_CACHE_TIMEOUT
+            )
+        return response
+    return wrapper
@@ -0,0 +1,49 @@
+from hashlib import md5
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.views.decorators.http import condition
+from .models import VersionStamp
+from .signals import recipes_changed
+
+
+def version_stamp(request):
+    """Return the version stamp of the requesting user, once per request"""
+    if not hasattr(request, '_version_stamp'):
+        # Normally created with the user, get_or_create covers the rest
+        request._version_stamp, _ = VersionStamp.objects.get_or_create(
+            user=request.user
+        )
+    return request._version_stamp
+
+
+def recipe_etag(request, *args, **kwargs):
+    """Return an ETag of the user's version and the requested url"""
+    stamp = version_stamp(request)
+    key = f'{stamp.user_id}.{stamp.version}:{request.get_full_path()}'
+    return md5(key.encode()).hexdigest()
+
+
+def recipe_last_modified(request, *args, **kwargs):
+    """Return when the user's recipe data last changed"""
+    return version_stamp(request).modified
+
+
+# Answers If-None-Match / If-Modified-Since with 304 from the stamp
+# alone, before the queryset or serializer of the view runs
+conditional = condition(
+    etag_func=recipe_etag, last_modified_func=recipe_last_modified
+)
+
+
+@receiver(recipes_changed)
+def bump_version_stamp(sender, user_ids, **kwargs):
+    """Bump the version stamps of the users whose data changed"""
+    VersionStamp.bump(user_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_version_stamp(sender, instance, created, **kwargs):
+    """Create the version stamp of a new user"""
+    if created:
+        VersionStamp.objects.create(user=instance)
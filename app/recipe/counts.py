@@ -0,0 +1,104 @@
+from collections import Counter, defaultdict
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import Tag, Ingredient, Recipe
+from .signals import notify
+
+# The model counted, its through table and the through column to it
+RELATIONS = {
+    Recipe.tags.through: (Tag, 'tag_id'),
+    Recipe.ingredients.through: (Ingredient, 'ingredient_id'),
+}
+
+
+def adjust_counts(model, deltas):
+    """Add the {id: delta} deltas to the recipe_count of model's rows
+
+    recipe_count is served to the rows' owners, so callers notify them
+    (see signals.attribute_owners) along with the recipe owner.
+    """
+    ids_by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            ids_by_delta[delta].append(pk)
+    # One UPDATE per distinct delta, usually just +1 or -1
+    for delta, ids in ids_by_delta.items():
+        model.objects.filter(id__in=ids).update(
+            recipe_count=F('recipe_count') + delta
+        )
+
+
+def through_counts(through, **filters):
+    """Return the number of through rows per counted id"""
+    model, column = RELATIONS[through]
+    return Counter(dict(through.objects.filter(**filters).order_by().values(
+        column
+    ).annotate(count=Count('id')).values_list(column, 'count')))
+
+
+def recount(model, through):
+    """Fix the recipe_count of rows that drifted, returning their number
+
+    The owners of the fixed rows are notified.
+    """
+    _, column = RELATIONS[through]
+    actual = Coalesce(Subquery(
+        through.objects.filter(**{column: OuterRef('pk')}).order_by().values(
+            column
+        ).annotate(count=Count('id')).values('count')
+    ), 0)
+    drifted = model.objects.exclude(recipe_count=actual)
+    owners = list(drifted.order_by().values_list(
+        'user_id', flat=True
+    ).distinct())
+    fixed = drifted.update(recipe_count=actual)
+    notify(model, owners)
+    return fixed
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep recipe_count in step with added and removed relations"""
+    model, column = RELATIONS[sender]
+    if reverse:
+        # instance is the tag or ingredient, pk_set holds recipe ids
+        side = {column: instance.pk}
+        if pk_set is not None:
+            side['recipe_id__in'] = pk_set
+    else:
+        side = {'recipe_id': instance.pk}
+        if pk_set is not None:
+            side[f'{column}__in'] = pk_set
+
+    if action == 'post_add':
+        if reverse:
+            adjust_counts(model, {instance.pk: len(pk_set)})
+        else:
+            adjust_counts(model, dict.fromkeys(pk_set, 1))
+    elif action in ('pre_remove', 'pre_clear'):
+        # remove() accepts unrelated ids, so count what will be deleted
+        instance._removed_counts = through_counts(sender, **side)
+    elif action in ('post_remove', 'post_clear'):
+        removed = instance.__dict__.pop('_removed_counts', Counter())
+        adjust_counts(model, {pk: -count for pk, count in removed.items()})
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Remember the tags and ingredients of a recipe being deleted"""
+    instance._relation_counts = {
+        through: through_counts(through, recipe_id=instance.pk)
+        for through in RELATIONS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Decrement the counts of the deleted recipe's tags and ingredients"""
+    counts = instance.__dict__.pop('_relation_counts', {})
+    for through, removed in counts.items():
+        model, _ = RELATIONS[through]
+        adjust_counts(model, {pk: -count for pk, count in removed.items()})
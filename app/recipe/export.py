@@ -0,0 +1,43 @@
+import json
+from itertools import islice
+from .representation import recipe_values, represent_recipes
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items of iterable"""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def export_recipes(queryset, fields, chunk_size):
+    """Yield the recipes of queryset with their tag and ingredient names
+
+    Rows come from a server-side cursor and relations are fetched per
+    chunk, so memory use depends on chunk_size only.
+    """
+    rows = recipe_values(queryset, fields).iterator(chunk_size=chunk_size)
+    for chunk in chunked(rows, chunk_size):
+        yield from represent_recipes(chunk, fields, detail=True)
+
+
+def _dumps(item):
+    """Return item as compact JSON"""
+    return json.dumps(item, separators=(',', ':'))
+
+
+def stream_ndjson(items):
+    """Yield items as newline delimited JSON"""
+    for item in items:
+        yield _dumps(item) + '\n'
+
+
+def stream_json_array(items):
+    """Yield items as one JSON array, an item at a time"""
+    separator = '['
+    for item in items:
+        yield separator + _dumps(item)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
@@ -0,0 +1,37 @@
+from django.conf import settings
+from .models import Recipe
+from .index import registry
+
+
+def _related_filter(queryset, through, column, ids, match_all):
+    """Filter recipes through a relation table without duplicating rows"""
+    rows = through.objects.values('recipe_id')
+    if match_all:
+        for related_id in ids:
+            queryset = queryset.filter(
+                id__in=rows.filter(**{column: related_id})
+            )
+        return queryset
+    return queryset.filter(id__in=rows.filter(**{f'{column}__in': ids}))
+
+
+def filter_recipes(queryset, user, tag_ids=None, ingredient_ids=None,
+                   match_all=False):
+    """Return recipes having any (or all) of the tags and ingredients"""
+    if not tag_ids and not ingredient_ids:
+        return queryset
+    if settings.RECIPE_FILTER_INDEX:
+        recipe_ids = registry.get(user.id).match(
+            tag_ids, ingredient_ids, match_all
+        )
+        return queryset.filter(id__in=recipe_ids)
+    if tag_ids:
+        queryset = _related_filter(
+            queryset, Recipe.tags.through, 'tag_id', tag_ids, match_all
+        )
+    if ingredient_ids:
+        queryset = _related_filter(
+            queryset, Recipe.ingredients.through, 'ingredient_id',
+            ingredient_ids, match_all
+        )
+    return queryset
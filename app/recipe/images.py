@@ -0,0 +1,193 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+from rest_framework import exceptions
+from core import metrics
+from .models import Recipe
+from .signals import notify
+
+# Pillow format of each variant file extension
+FORMATS = {'jpeg': 'JPEG', 'webp': 'WEBP'}
+VARIANTS_DIR = 'uploads/recipe/variants'
+# Pillow formats accepted for uploaded images
+ACCEPTED_FORMATS = {'GIF', 'JPEG', 'MPO', 'PNG', 'WEBP'}
+# EXIF orientation tag, and its values turning the image a quarter
+ORIENTATION = 0x0112
+QUARTER_TURNS = {5, 6, 7, 8}
+
+
+def variants_dir(image_name):
+    """Return the storage directory of the variants of an image"""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{VARIANTS_DIR}/{stem}'
+
+
+def read_header(file, size):
+    """Return the format, width and height of an image of size bytes
+
+    Only the header is read: the pixels are never decoded, so the byte
+    and pixel limits hold before any memory is spent on them. Width and
+    height are as displayed; the EXIF orientation itself is left in the
+    original and applied when the variants are rendered.
+    """
+    if size > settings.RECIPE_UPLOAD_MAX_SIZE:
+        raise exceptions.ValidationError(
+            f'Images have at most {settings.RECIPE_UPLOAD_MAX_SIZE} bytes.'
+        )
+    try:
+        with Image.open(file) as image:
+            image_format = image.format
+            width, height = image.size
+            # getexif() would decode a PNG to look past its header
+            exif = Image.Exif()
+            if image.info.get('exif'):
+                exif.load(image.info['exif'])
+            orientation = exif.get(ORIENTATION)
+    except Exception:
+        # Pillow raises DecompressionBombError past its own limit
+        raise exceptions.ValidationError('Upload a valid image.')
+    if image_format not in ACCEPTED_FORMATS:
+        raise exceptions.ValidationError(
+            f'{image_format} images are not accepted.'
+        )
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise exceptions.ValidationError(
+            f'Images have at most {settings.RECIPE_IMAGE_MAX_PIXELS} pixels.'
+        )
+    if orientation in QUARTER_TURNS:
+        width, height = height, width
+    return image_format, width, height
+
+
+def inspect_image(file, size):
+    """Return read_header() of an uploaded image, counting its time"""
+    started = time.perf_counter()
+    try:
+        if hasattr(file, 'seek'):
+            file.seek(0)
+        header = read_header(file, size)
+    except exceptions.ValidationError:
+        metrics.increment('recipe_images.rejected')
+        raise
+    finally:
+        metrics.increment('recipe_images.validated')
+        metrics.increment(
+            'recipe_images.validation_seconds', time.perf_counter() - started
+        )
+        if hasattr(file, 'seek'):
+            file.seek(0)
+    return header
+
+
+def image_urls(image_name, variants):
+    """Return the URLs of an image and of its variants per format
+
+    Until the variants are ready each one points at the original.
+    """
+    if not image_name:
+        return None
+    original = default_storage.url(image_name)
+    urls = {'original': original}
+    for name in settings.RECIPE_IMAGE_VARIANTS:
+        urls[name] = {
+            ext: default_storage.url(f'{variants}/{name}.{ext}')
+            if variants else original
+            for ext in settings.RECIPE_IMAGE_FORMATS
+        }
+    return urls
+
+
+def render_variants(source, target, sizes, formats, quality):
+    """Write resized copies of the image at source into target
+
+    Runs in a worker process: it touches files only, never the database.
+    """
+    os.makedirs(target, exist_ok=True)
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for name, size in sizes.items():
+            variant = image.copy()
+            # Shrinks to fit a size x size box, never enlarges
+            variant.thumbnail((size, size), Image.LANCZOS)
+            for ext in formats:
+                variant.save(
+                    os.path.join(target, f'{name}.{ext}'), FORMATS[ext],
+                    quality=quality
+                )
+
+
+_executor = None
+
+
+def image_executor():
+    """Return the process pool rendering image variants"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(settings.RECIPE_IMAGE_WORKERS)
+    return _executor
+
+
+def build_variants(recipe):
+    """Return a future of the variants rendered for the recipe's image
+
+    With RECIPE_IMAGE_WORKERS at 0 they are rendered right away.
+    """
+    name = recipe.image.name
+    args = (
+        default_storage.path(name),
+        default_storage.path(variants_dir(name)),
+        dict(settings.RECIPE_IMAGE_VARIANTS),
+        tuple(settings.RECIPE_IMAGE_FORMATS),
+        settings.RECIPE_IMAGE_QUALITY,
+    )
+    if settings.RECIPE_IMAGE_WORKERS:
+        return image_executor().submit(render_variants, *args)
+    future = Future()
+    try:
+        future.set_result(render_variants(*args))
+    except Exception as error:
+        future.set_exception(error)
+    return future
+
+
+def finish_variants(recipe, future):
+    """Record the variants of a rendered image on the recipe
+
+    Nothing is recorded when the recipe's image was replaced meanwhile.
+    Returns whether the variants were recorded.
+    """
+    if future.exception() is not None:
+        metrics.increment('recipe_images.failed')
+        return False
+    name = recipe.image.name
+    updated = Recipe.objects.filter(pk=recipe.pk, image=name).update(
+        image_variants=variants_dir(name)
+    )
+    if updated:
+        recipe.image_variants = variants_dir(name)
+        metrics.increment('recipe_images.rendered')
+        notify(Recipe, [recipe.user_id])
+    return bool(updated)
+
+
+def _finish_in_background(recipe, future):
+    """Record the variants from the pool's callback thread"""
+    try:
+        finish_variants(recipe, future)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe):
+    """Render the variants of the recipe's image off the request thread"""
+    future = build_variants(recipe)
+    if settings.RECIPE_IMAGE_WORKERS:
+        future.add_done_callback(partial(_finish_in_background, recipe))
+    else:
+        finish_variants(recipe, future)
+    return future
@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+from collections import Counter
+from django.db import connection, transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty
+from .bulk import upsert_names
+from .counts import adjust_counts
+from .models import Tag, Ingredient, Recipe
+from .serializers import RecipeBulkItemSerializer
+from .signals import attribute_owners, notify
+
+SCALAR_FIELDS = ('name', 'time_took_min', 'price', 'url')
+RELATIONS = (
+    ('tags', Tag, Recipe.tags.through, 'tag_id'),
+    ('ingredients', Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+)
+# Separator of the tag and ingredient names in a CSV cell
+CSV_LIST_SEPARATOR = '|'
+
+
+def read_csv(file):
+    """Yield the records of a CSV file with a header row"""
+    for row in csv.DictReader(file):
+        for field, _, _, _ in RELATIONS:
+            value = row.get(field) or ''
+            row[field] = [
+                name for name in value.split(CSV_LIST_SEPARATOR) if name
+            ]
+        yield row
+
+
+def read_ndjson(file):
+    """Yield the records of a file with one JSON object per line
+
+    A line that isn't valid JSON is yielded as a ValidationError, which
+    clean_record() raises to reject it like any other invalid record.
+    """
+    for number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                yield ValidationError(
+                    f'Line {number} is not valid JSON: {error.msg}.'
+                )
+
+
+def record_fields():
+    """Return the serializer fields validating the recipe values
+
+    The relation fields take lists of names instead of ids.
+    """
+    fields = dict(RecipeBulkItemSerializer().fields)
+    for field, _, _, _ in RELATIONS:
+        fields[field] = serializers.ListField(
+            child=serializers.CharField(max_length=255)
+        )
+    return fields
+
+
+def clean_record(record, fields):
+    """Return the validated recipe values and relation names of a record"""
+    if isinstance(record, ValidationError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValidationError('Record must be an object.')
+    values, errors = {}, {}
+    for name in SCALAR_FIELDS:
+        try:
+            values[name] = fields[name].run_validation(
+                record.get(name, empty)
+            )
+        except SkipField:
+            values[name] = Recipe._meta.get_field(name).get_default()
+        except ValidationError as error:
+            errors[name] = error.detail
+    names = {}
+    for field, _, _, _ in RELATIONS:
+        value = record.get(field)
+        try:
+            names[field] = fields[field].run_validation(
+                [] if value is None else value
+            )
+        except ValidationError as error:
+            errors[field] = error.detail
+    if errors:
+        raise ValidationError(errors)
+    return values, names
+
+
+def _reserve_ids(table, count):
+    """Return count new ids from the id sequence of table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+            "FROM generate_series(1, %s)",
+            [table, count]
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def _copy(table, columns, rows):
+    """Load rows into table with COPY"""
+    buffer = io.StringIO()
+    # Quoting every value keeps empty strings apart from NULL
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        quote(table), ', '.join(quote(column) for column in columns)
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+
+
+def _insert_postgres(user, recipes, relations):
+    """Insert the recipes and their relations with COPY"""
+    ids = _reserve_ids(Recipe._meta.db_table, len(recipes))
+    _copy(
+        Recipe._meta.db_table,
+        ('id', 'user_id', 'image', 'image_variants') + SCALAR_FIELDS,
+        (
+            [pk, user.id, '', ''] + [values[name] for name in SCALAR_FIELDS]
+            for pk, values in zip(ids, recipes)
+        )
+    )
+    for (_, _, through, column), related in zip(RELATIONS, relations):
+        _copy(
+            through._meta.db_table,
+            ('recipe_id', column),
+            ((ids[i], pk) for i, pks in enumerate(related) for pk in pks)
+        )
+
+
+def _insert_generic(user, recipes, relations):
+    """Insert the recipes and their relations with the ORM"""
+    objs = [Recipe(user=user, **values) for values in recipes]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(objs)
+    else:
+        for recipe in objs:
+            recipe.save()
+    for (_, _, through, column), related in zip(RELATIONS, relations):
+        through.objects.bulk_create(
+            through(recipe_id=objs[i].id, **{column: pk})
+            for i, pks in enumerate(related) for pk in pks
+        )
+
+
+def import_batch(user, checkpoint, records, read):
+    """Import the cleaned records and advance the checkpoint atomically
+
+    The checkpoint moves past the `read` records of the batch, rejected
+    ones included, once the batch is written.
+    """
+    with transaction.atomic():
+        relations = []
+        for field, model, _, _ in RELATIONS:
+            names = sorted({
+                name for _, record_names in records
+                for name in record_names[field]
+            })
+            ids = {}
+            if names:
+                ids = dict(zip(names, upsert_names(model, user, names)))
+            relations.append([
+                {ids[name] for name in record_names[field]}
+                for _, record_names in records
+            ])
+        if records:
+            if connection.vendor == 'postgresql':
+                insert = _insert_postgres
+            else:
+                insert = _insert_generic
+            insert(user, [values for values, _ in records], relations)
+            # Names may resolve to tags and ingredients of other users
+            owners = {user.id}
+            for (_, model, _, _), related in zip(RELATIONS, relations):
+                deltas = Counter(pk for pks in related for pk in pks)
+                adjust_counts(model, deltas)
+                owners.update(attribute_owners(model, pk__in=list(deltas)))
+            # COPY and bulk_create send no model or m2m signals
+            notify(Recipe, owners)
+        checkpoint.position += read
+        checkpoint.save()
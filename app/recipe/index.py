@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.dispatch import receiver
+from .models import Recipe
+from .signals import recipes_changed
+
+
+class RecipeIndex:
+    """Inverted index from tag and ingredient ids to a user's recipe ids"""
+
+    def __init__(self, tags, ingredients):
+        self.tags = tags
+        self.ingredients = ingredients
+
+    @classmethod
+    def build(cls, user_id):
+        """Build the index of a user with one query per relation"""
+        return cls(
+            cls._postings(Recipe.tags.through, 'tag_id', user_id),
+            cls._postings(Recipe.ingredients.through, 'ingredient_id', user_id)
+        )
+
+    @staticmethod
+    def _postings(through, column, user_id):
+        """Return a mapping of related id to the set of recipe ids"""
+        postings = {}
+        rows = through.objects.filter(recipe__user_id=user_id).values_list(
+            column, 'recipe_id'
+        )
+        for related_id, recipe_id in rows:
+            postings.setdefault(related_id, set()).add(recipe_id)
+        return {key: frozenset(value) for key, value in postings.items()}
+
+    @staticmethod
+    def _combine(postings, ids, match_all):
+        """Intersect or unite the postings of the given ids"""
+        sets = [postings.get(i, frozenset()) for i in ids]
+        if match_all:
+            return frozenset.intersection(*sets)
+        return frozenset().union(*sets)
+
+    def match(self, tag_ids=None, ingredient_ids=None, match_all=False):
+        """Return the recipe ids matching the tag and ingredient filters"""
+        result = None
+        for postings, ids in ((self.tags, tag_ids),
+                              (self.ingredients, ingredient_ids)):
+            if ids:
+                found = self._combine(postings, ids, match_all)
+                result = found if result is None else result & found
+        return result
+
+
+class IndexRegistry:
+    """Per-process LRU of derived per-user structures
+
+    `build` is called with a key to create a missing entry, and entries
+    are dropped through `invalidate` when the underlying rows change.
+    With a `ttl` in seconds entries are also rebuilt once they are older,
+    bounding staleness from writes made by other processes.
+    """
+
+    def __init__(self, build, max_size, ttl=None):
+        self.build = build
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._builds = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the entry for key, building it if needed"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                entry, expires = cached
+                if expires is None or time.monotonic() < expires:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+            build = self._builds[key] = object()
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        entry = self.build(key)
+        with self._lock:
+            # An invalidation while building drops the token: don't keep
+            # an entry that may already be stale
+            if self._builds.get(key) is build:
+                del self._builds[key]
+                self._entries[key] = (entry, expires)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, keys):
+        """Drop the entries of the given keys"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._builds.pop(key, None)
+
+
+registry = IndexRegistry(
+    RecipeIndex.build, settings.RECIPE_FILTER_INDEX_MAX_USERS
+)
+
+
+@receiver(recipes_changed)
+def invalidate_index(sender, user_ids, **kwargs):
+    """Drop stale indexes when recipe relations change"""
+    registry.invalidate(user_ids)
@@ -0,0 +1,127 @@
+# Generated by Django 3.0.5 on 2026-10-18 19:30
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_DOCUMENT_SQL = """
+CREATE OR REPLACE FUNCTION recipe_search_document(rid integer, rname text)
+RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('english', coalesce(rname, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t.name, ' ') FROM recipe_tag t
+            JOIN recipe_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = rid
+        ), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(i.name, ' ') FROM recipe_ingredient i
+            JOIN recipe_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = rid
+        ), '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION recipe_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := recipe_search_document(NEW.id, NEW.name);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipe_search_vector_update
+    BEFORE INSERT OR UPDATE OF name ON recipe_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipe_search_vector_trigger();
+
+-- Relation rows: one UPDATE per statement, so bulk inserts stay cheap
+CREATE OR REPLACE FUNCTION recipe_relation_search_trigger()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE recipe_recipe SET search_vector = recipe_search_document(id, name)
+    WHERE id IN (SELECT recipe_id FROM changed_rows);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipe_tags_search_insert
+    AFTER INSERT ON recipe_recipe_tags REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE recipe_relation_search_trigger();
+CREATE TRIGGER recipe_tags_search_delete
+    AFTER DELETE ON recipe_recipe_tags REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE recipe_relation_search_trigger();
+CREATE TRIGGER recipe_ingredients_search_insert
+    AFTER INSERT ON recipe_recipe_ingredients
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE recipe_relation_search_trigger();
+CREATE TRIGGER recipe_ingredients_search_delete
+    AFTER DELETE ON recipe_recipe_ingredients
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE recipe_relation_search_trigger();
+
+-- Renamed tags and ingredients: TG_ARGV holds the relation table and column
+CREATE OR REPLACE FUNCTION recipe_attr_search_trigger() RETURNS trigger AS $$
+BEGIN
+    EXECUTE format(
+        'UPDATE recipe_recipe SET search_vector = '
+        'recipe_search_document(id, name) WHERE id IN '
+        '(SELECT recipe_id FROM %I WHERE %I = $1)',
+        TG_ARGV[0], TG_ARGV[1]
+    ) USING NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipe_tag_search_rename
+    AFTER UPDATE OF name ON recipe_tag FOR EACH ROW
+    EXECUTE PROCEDURE recipe_attr_search_trigger('recipe_recipe_tags', 'tag_id');
+CREATE TRIGGER recipe_ingredient_search_rename
+    AFTER UPDATE OF name ON recipe_ingredient FOR EACH ROW
+    EXECUTE PROCEDURE recipe_attr_search_trigger(
+        'recipe_recipe_ingredients', 'ingredient_id'
+    );
+"""
+
+DROP_SEARCH_DOCUMENT_SQL = """
+DROP TRIGGER IF EXISTS recipe_ingredient_search_rename ON recipe_ingredient;
+DROP TRIGGER IF EXISTS recipe_tag_search_rename ON recipe_tag;
+DROP TRIGGER IF EXISTS recipe_ingredients_search_delete
+    ON recipe_recipe_ingredients;
+DROP TRIGGER IF EXISTS recipe_ingredients_search_insert
+    ON recipe_recipe_ingredients;
+DROP TRIGGER IF EXISTS recipe_tags_search_delete ON recipe_recipe_tags;
+DROP TRIGGER IF EXISTS recipe_tags_search_insert ON recipe_recipe_tags;
+DROP TRIGGER IF EXISTS recipe_search_vector_update ON recipe_recipe;
+DROP FUNCTION IF EXISTS recipe_attr_search_trigger();
+DROP FUNCTION IF EXISTS recipe_relation_search_trigger();
+DROP FUNCTION IF EXISTS recipe_search_vector_trigger();
+DROP FUNCTION IF EXISTS recipe_search_document(integer, text);
+"""
+
+
+def is_postgres(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+def create_search_triggers(apps, schema_editor):
+    if is_postgres(schema_editor):
+        # No params: keep the % of format() away from the driver
+        schema_editor.execute(SEARCH_DOCUMENT_SQL, params=None)
+
+
+def drop_search_triggers(apps, schema_editor):
+    if is_postgres(schema_editor):
+        schema_editor.execute(DROP_SEARCH_DOCUMENT_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0005_auto_20200427_1543'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 3.0.5 on 2026-10-18 19:31
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def is_postgres(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+def create_search_indexes(apps, schema_editor):
+    if not is_postgres(schema_editor):
+        return
+    Recipe = apps.get_model('recipe', 'Recipe')
+    schema_editor.add_index(Recipe, django.contrib.postgres.indexes.GinIndex(
+        fields=['search_vector'], name='recipe_search_gin'
+    ))
+    # The trigram fallback is only available where pg_trgm is installed
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        has_trigram = cursor.fetchone() is not None
+    if has_trigram:
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS recipe_name_trgm '
+            'ON recipe_recipe USING gin (name gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if is_postgres(schema_editor):
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_name_trgm')
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_gin')
+
+
+def backfill_search_vectors(apps, schema_editor):
+    """Fill the search vector of existing recipes in batches"""
+    if not is_postgres(schema_editor):
+        return
+    Recipe = apps.get_model('recipe', 'Recipe')
+    last_id = 0
+    while True:
+        ids = list(Recipe.objects.filter(id__gt=last_id).order_by('id')
+                   .values_list('id', flat=True)[:BACKFILL_BATCH_SIZE])
+        if not ids:
+            break
+        schema_editor.execute(
+            'UPDATE recipe_recipe '
+            'SET search_vector = recipe_search_document(id, name) '
+            'WHERE id >= %s AND id <= %s',
+            (ids[0], ids[-1])
+        )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    # Every backfill batch commits on its own, so large tables are not
+    # locked for the whole migration
+    atomic = False
+
+    dependencies = [
+        ('recipe', '0006_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_search_vectors, migrations.RunPython.noop
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_gin'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(
+                    create_search_indexes, drop_search_indexes
+                ),
+            ],
+        ),
+    ]
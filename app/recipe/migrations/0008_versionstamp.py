@@ -0,0 +1,38 @@
+# Generated by Django 3.0.5 on 2026-10-18 19:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def create_version_stamps(apps, schema_editor):
+    """Create the version stamps of the existing users"""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    VersionStamp = apps.get_model('recipe', 'VersionStamp')
+    VersionStamp.objects.bulk_create(
+        VersionStamp(user_id=pk)
+        for pk in User.objects.values_list('pk', flat=True).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0007_recipe_search_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(
+            create_version_stamps, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.0.5 on 2026-10-18 19:49
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    """Set the recipe_count of the existing tags and ingredients"""
+    Recipe = apps.get_model('recipe', 'Recipe')
+    for field, column in (('tags', 'tag_id'), ('ingredients', 'ingredient_id')):
+        relation = Recipe._meta.get_field(field)
+        through = relation.remote_field.through
+        counts = through.objects.filter(
+            **{column: OuterRef('pk')}
+        ).order_by().values(column).annotate(count=Count('id')).values('count')
+        relation.related_model.objects.update(
+            recipe_count=Coalesce(Subquery(counts), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0009_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count'], name='recipe_ingredient_usage'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count'], name='recipe_tag_usage'),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+    ]
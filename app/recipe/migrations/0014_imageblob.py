@@ -0,0 +1,29 @@
+# Generated by Django 3.0.5 on 2026-10-18 20:20
+
+from django.db import migrations, models
+import recipe.models
+import recipe.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0013_imageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('refs', models.IntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=recipe.storage.ContentAddressedStorage(), upload_to=recipe.models.recipe_image_file_path),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 import os
 import uuid
+from .storage import ContentAddressedStorage
 
 
 def recipe_image_file_path(instance, filename):
@@ -11,31 +15,58 @@ def recipe_image_file_path(instance, filename):
     return "uploads/recipe/" + filename
 
 
-class Tag(models.Model):
+class RecipeCountMixin:
+    """Keep save() from writing back a stale recipe_count"""
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'recipe_count'
+            ]
+        super().save(*args, **kwargs)
+
+
+class Tag(RecipeCountMixin, models.Model):
     """Tag model that support tag feature"""
     name = models.CharField(unique=True, max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Number of recipes with this tag, maintained by recipe/counts.py
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-name']
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe_count'], name='recipe_tag_usage'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(RecipeCountMixin, models.Model):
     """Ingredient model to be use in the recipe"""
     name = models.CharField(unique=True, max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Number of recipes with this ingredient, see recipe/counts.py
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-name']
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe_count'],
+                name='recipe_ingredient_usage'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -54,11 +85,108 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField(Ingredient)
     tags = models.ManyToManyField(Tag)
     image = models.ImageField(
-        null=True, blank=True, upload_to=recipe_image_file_path
+        null=True, blank=True, upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage()
+    )
+    # Directory of the resized copies of image once rendered, see
+    # recipe/images.py; empty while they are pending
+    image_variants = models.CharField(
+        max_length=255, blank=True, editable=False
     )
+    # Maintained by database triggers from the recipe name and the names
+    # of its tags and ingredients, see migration 0006
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['id']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='recipe_search_gin'),
+            # Keyset pages of a user's recipes per sortable column
+            models.Index(
+                fields=['user', 'price', 'id'], name='recipe_user_price'
+            ),
+            models.Index(
+                fields=['user', 'time_took_min', 'id'],
+                name='recipe_user_time'
+            ),
+            models.Index(
+                fields=['user', 'name', 'id'], name='recipe_user_name'
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class VersionStamp(models.Model):
+    """Version of a user's recipes, tags and ingredients
+
+    Bumped on every change so conditional GETs can be answered from
+    this row alone.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    version = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def bump(cls, user_ids):
+        """Increment the versions of the given users"""
+        # Update only: a stamp is created on its first read, which also
+        # keeps user deletion from inserting rows for the deleted user
+        cls.objects.filter(user_id__in=user_ids).update(
+            version=models.F('version') + 1, modified=timezone.now()
+        )
+
+    def __str__(self):
+        return f'{self.user_id}.{self.version}'
+
+
+class ImportCheckpoint(models.Model):
+    """Input records consumed by a run of the import_recipes command
+
+    Updated in the transaction of each imported batch, so a failed
+    import resumes right after the last committed batch.
+    """
+    source = models.CharField(max_length=255, unique=True)
+    position = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.source}:{self.position}'
+
+
+class ImageUpload(models.Model):
+    """A recipe image being uploaded in chunks, see recipe/uploads.py
+
+    The bytes received so far are on disk under MEDIA_ROOT; `offset` is
+    their count, where the next chunk must start.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='image_uploads'
+    )
+    size = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.id}:{self.offset}/{self.size}'
+
+
+class ImageBlob(models.Model):
+    """A recipe image stored once under its SHA-256, see recipe/blobs.py
+
+    `refs` counts the recipes using it; unreferenced blobs are deleted
+    by the dedupe_images command.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255)
+    refs = models.IntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name}:{self.refs}'
@@ -0,0 +1,140 @@
+import json
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import remove_query_param
+
+
+def _keyset_filter(ordering, position):
+    """Return the rows after position in ordering, compared as a tuple
+
+    (a, b) after (x, y) is `a > x OR (a = x AND b > y)`, with < for the
+    descending columns.
+    """
+    condition, equal = Q(), Q()
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _reversed(ordering):
+    """Return ordering with every column's direction flipped"""
+    return tuple(
+        field[1:] if field.startswith('-') else '-' + field
+        for field in ordering
+    )
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for the recipe list, ordered by id
+
+    DRF's cursor holds the first column's value plus an offset into the
+    rows sharing it, which breaks down in long runs of equal values.
+    The cursor here holds the values of every ordering column of the
+    last row, the id tiebreak included, and pages are found with a
+    keyset filter on them whatever the number of ties.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        """Order ranked search results by relevance, ties broken by id"""
+        ranked = 'rank' in queryset.query.annotations
+        if ranked and 'ordering' not in request.query_params:
+            return ('-rank', 'id')
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering[0].lstrip('-') in ('id', 'pk'):
+            return ordering[:1]
+        # Same direction as the first column, so a (user, column, id)
+        # index serves the ORDER BY without a sort
+        tiebreak = '-id' if ordering[0].startswith('-') else 'id'
+        return (ordering[0], tiebreak)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the page after, or before, the cursor's position"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor and self.cursor.position
+
+        ordering = _reversed(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(_keyset_filter(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def _position(self, row):
+        """Return the values of the ordering columns of a row"""
+        return [
+            row[field.lstrip('-')] if isinstance(row, dict)
+            else getattr(row, field.lstrip('-'))
+            for field in self.ordering
+        ]
+
+    def _link(self, reverse, row):
+        """Return the link to the rows before or after row
+
+        Without a row the link points at the first page, or at the last
+        one for reverse.
+        """
+        if row is None:
+            if not reverse:
+                return remove_query_param(
+                    self.base_url, self.cursor_query_param
+                )
+            return self.encode_cursor(Cursor(0, True, None))
+        position = json.dumps(self._position(row), cls=DjangoJSONEncoder)
+        return self.encode_cursor(Cursor(0, reverse, position))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self._link(False, self.page[-1] if self.page else None)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self._link(True, self.page[0] if self.page else None)
+
+    def decode_cursor(self, request):
+        """Return the cursor with its position decoded to column values"""
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list):
+            raise NotFound(self.invalid_cursor_message)
+        scalars = [isinstance(value, (str, int, float)) for value in position]
+        if len(position) != len(self.ordering) or not all(scalars):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(0, cursor.reverse, position)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """Keyset pagination for tags and ingredients, ordered by name"""
+    ordering = '-name'
@@ -0,0 +1,74 @@
+from collections import defaultdict
+from .images import image_urls
+from .models import Recipe
+from .serializers import RecipeSerializer
+
+RELATIONS = (
+    ('tags', Recipe.tags.through, 'tag'),
+    ('ingredients', Recipe.ingredients.through, 'ingredient'),
+)
+RELATION_NAMES = {name for name, _, _ in RELATIONS}
+# Fields computed from other columns
+COMPUTED = {'images': ('image', 'image_variants')}
+
+
+def recipe_values(queryset, fields, extra=()):
+    """Return queryset as dicts of the id and the scalar fields selected
+
+    Annotations such as the search rank and the `extra` columns are
+    kept, the paginator orders and builds its cursor from them.
+    """
+    columns = set()
+    for name in RecipeSerializer.Meta.fields:
+        if name not in fields or name in RELATION_NAMES:
+            continue
+        columns.update(COMPUTED.get(name, [name]))
+    columns.update(extra, queryset.query.annotations, ['id'])
+    return queryset.values(*columns)
+
+
+def _related(through, column, recipe_ids, detail):
+    """Return the related ids, or nested objects, of each recipe"""
+    related = defaultdict(list)
+    rows = through.objects.filter(recipe_id__in=recipe_ids).order_by(
+        f'-{column}__name'
+    ).values_list(
+        'recipe_id', f'{column}_id', f'{column}__name'
+    )
+    for recipe_id, pk, name in rows:
+        related[recipe_id].append(
+            {'id': pk, 'name': name} if detail else pk
+        )
+    return related
+
+
+def represent_recipes(rows, fields, detail=False):
+    """Return the recipe rows as RecipeSerializer would render them
+
+    With `detail` tags and ingredients are nested like in
+    RecipeDetailSerializer. Each relation costs one query for all rows
+    and no model instances or serializers are created per row.
+    """
+    scalar = RecipeSerializer().fields
+    order = [name for name in RecipeSerializer.Meta.fields if name in fields]
+    related = {}
+    for name, through, column in RELATIONS:
+        if name in fields:
+            related[name] = _related(
+                through, column, [row['id'] for row in rows], detail
+            )
+
+    data = []
+    for row in rows:
+        item = {}
+        for name in order:
+            if name in related:
+                item[name] = related[name].get(row['id'], [])
+            elif name == 'images':
+                item[name] = image_urls(row['image'], row['image_variants'])
+            elif row[name] is None:
+                item[name] = None
+            else:
+                item[name] = scalar[name].to_representation(row[name])
+        data.append(item)
+    return data
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, TrigramSimilarity
+)
+from django.db import connection
+from django.db.models import F, Q
+from .models import Recipe
+
+# Must match the configuration used by recipe_search_document() in the
+# 0006 migration, otherwise queries and documents are stemmed differently
+SEARCH_CONFIG = 'english'
+
+
+def _related_name_filter(term):
+    """Match recipes by name, tag name or ingredient name substring"""
+    tagged = Recipe.tags.through.objects.filter(tag__name__icontains=term)
+    with_ingredient = Recipe.ingredients.through.objects.filter(
+        ingredient__name__icontains=term
+    )
+    condition = Q(name__icontains=term)
+    condition |= Q(id__in=tagged.values('recipe_id'))
+    condition |= Q(id__in=with_ingredient.values('recipe_id'))
+    return condition
+
+
+def search_recipes(queryset, term):
+    """Return recipes matching `term`
+
+    On PostgreSQL the recipes are matched against the search vector and
+    annotated with a `rank`. When nothing matches, trigram similarity of
+    the name is tried instead, which catches typos. Other databases get
+    an unranked substring match.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.filter(_related_name_filter(term))
+    query = SearchQuery(term, config=SEARCH_CONFIG)
+    matches = queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query)
+    )
+    if not settings.RECIPE_SEARCH_TRIGRAM or matches.exists():
+        return matches
+    # The % operator of trigram_similar can use the recipe_name_trgm index
+    return queryset.filter(name__trigram_similar=term).annotate(
+        rank=TrigramSimilarity('name', term)
+    )
@@ -1,24 +1,51 @@
+import os
 from rest_framework import serializers
-from .models import Tag, Ingredient, Recipe
+from rest_framework.permissions import SAFE_METHODS
+from .images import image_urls, inspect_image
+from .storage import format_extension
+from .models import Tag, Ingredient, Recipe, ImageUpload
 
 
-class TagSerializer(serializers.ModelSerializer):
+def selected_fields(request, available):
+    """Return the fields of `available` kept by ?fields= and ?omit="""
+    fields = set(available)
+    if request is None or request.method not in SAFE_METHODS:
+        return fields
+    only = request.query_params.get('fields')
+    omit = request.query_params.get('omit')
+    if only:
+        fields &= set(only.split(','))
+    if omit:
+        fields -= set(omit.split(','))
+    return fields
+
+
+class SparseFieldsMixin:
+    """Drop the fields not requested with ?fields= or ?omit= on reads"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = selected_fields(self.context.get('request'), self.fields)
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Tag objects"""
     class Meta:
         model = Tag
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for the ingredient"""
     class Meta:
         model = Ingredient
-        fields = ['id', 'name']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ['id', 'recipe_count']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serialize the recipe model"""
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -28,25 +55,116 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'name', 'ingredients', 'tags', 'time_took_min',
-            'price', 'url'
+            'price', 'url', 'images'
         )
         read_only_fields = ['id']
 
+    def get_images(self, recipe):
+        """Return the image URLs, the original standing in for variants"""
+        return image_urls(recipe.image.name, recipe.image_variants)
+
+
+class RecipeRangeSerializer(serializers.Serializer):
+    """Validate the price and cooking time range filters of recipes"""
+    price_min = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False
+    )
+    price_max = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False
+    )
+    time_max = serializers.IntegerField(min_value=0, required=False)
+
+
+class RecipeBulkItemSerializer(serializers.ModelSerializer):
+    """Validate one recipe of a bulk request
+
+    Tags and ingredients are plain id lists here, their existence is
+    checked for the whole batch at once instead of one query per id.
+    """
+    id = serializers.IntegerField(required=False)
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        # Images are uploaded one recipe at a time
+        fields = tuple(
+            name for name in RecipeSerializer.Meta.fields if name != 'images'
+        )
+
+
+class NestedTagSerializer(TagSerializer):
+    """Tag nested in a recipe, without the tag owner's recipe_count
+
+    The recipe may belong to another user, whose cached responses don't
+    change when the count does.
+    """
+    class Meta(TagSerializer.Meta):
+        fields = ['id', 'name']
+
+
+class NestedIngredientSerializer(IngredientSerializer):
+    """Ingredient nested in a recipe, see NestedTagSerializer"""
+    class Meta(IngredientSerializer.Meta):
+        fields = ['id', 'name']
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize the recipe detail"""
-    ingredients = IngredientSerializer(many=True, read_only=True)
-    tags = TagSerializer(many=True, read_only=True)
+    ingredients = NestedIngredientSerializer(many=True, read_only=True)
+    tags = NestedTagSerializer(many=True, read_only=True)
+
+
+class ImageHeaderField(serializers.FileField):
+    """Image field checking the header only, see images.read_header()
+
+    Unlike ImageField, the upload is never decoded by Pillow here. The
+    file is renamed to the extension of its format, whatever it was
+    sent as.
+    """
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        image_format = inspect_image(file, file.size)[0]
+        stem = os.path.splitext(os.path.basename(file.name))[0] or 'image'
+        file.name = stem + format_extension(image_format)
+        return file
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipe"""
+    image = ImageHeaderField(allow_null=True, max_length=100, required=False)
+    images = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'images']
         read_only_fields = ['id']
+
+    def get_images(self, recipe):
+        """Return the image URLs, the original standing in for variants"""
+        return image_urls(recipe.image.name, recipe.image_variants)
+
+    def update(self, instance, validated_data):
+        """Replace the image, its variants are pending until rendered"""
+        instance.image_variants = ''
+        return super().update(instance, validated_data)
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer for chunked image uploads"""
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'size', 'offset', 'modified']
+        read_only_fields = ['id', 'offset', 'modified']
@@ -0,0 +1,119 @@
+from django.db.models.signals import (
+    m2m_changed, post_save, post_delete, pre_delete
+)
+from django.dispatch import Signal, receiver
+from .models import Tag, Ingredient, Recipe
+
+# Sent with `user_ids` whenever the recipe data of those users changed.
+# Code that writes without model signals (bulk operations) sends it
+# directly, so every derived cache listens to this single signal.
+recipes_changed = Signal(providing_args=['user_ids'])
+
+
+def notify(sender, user_ids):
+    """Send recipes_changed for the given users"""
+    user_ids = set(user_ids)
+    if user_ids:
+        recipes_changed.send(sender=sender, user_ids=user_ids)
+
+
+def recipe_owners(**filters):
+    """Return the ids of the users owning the matching recipes"""
+    return Recipe.objects.filter(**filters).values_list(
+        'user_id', flat=True
+    ).distinct()
+
+
+def attribute_owners(model, **filters):
+    """Return the ids of the users owning the matching tags/ingredients
+
+    Recipes reference tags and ingredients of any user, so a recipe
+    write changes what their owners see (recipe_count, assigned_only).
+    """
+    return model.objects.filter(**filters).order_by().values_list(
+        'user_id', flat=True
+    ).distinct()
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Remember the owners of the tags and ingredients losing the recipe"""
+    instance._attribute_owners = list(
+        attribute_owners(Tag, recipe=instance).union(
+            attribute_owners(Ingredient, recipe=instance)
+        )
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_saved_or_deleted(sender, instance, **kwargs):
+    """Notify that a recipe of the owner changed"""
+    owners = instance.__dict__.pop('_attribute_owners', [])
+    notify(sender, owners + [instance.user_id])
+
+
+def relation_field(sender):
+    """Return the Recipe field name of a tag or ingredient relation"""
+    if sender in (Tag, Recipe.tags.through):
+        return 'tags'
+    return 'ingredients'
+
+
+def relation_model(sender):
+    """Return the model of a tag or ingredient relation"""
+    return Tag if relation_field(sender) == 'tags' else Ingredient
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def attr_saved(sender, instance, created, **kwargs):
+    """Notify the owner and, on rename, the owners of related recipes"""
+    owners = []
+    if not created:
+        owners = list(recipe_owners(**{relation_field(sender): instance}))
+    notify(sender, owners + [instance.user_id])
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def attr_deleting(sender, instance, **kwargs):
+    """Remember the owners of recipes about to lose the relation"""
+    instance._related_recipe_owners = list(
+        recipe_owners(**{relation_field(sender): instance})
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def attr_deleted(sender, instance, **kwargs):
+    """Notify the owner and the owners of recipes that lost the relation"""
+    owners = instance.__dict__.pop('_related_recipe_owners', [])
+    notify(sender, owners + [instance.user_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Notify the owners of the recipes and of the related objects"""
+    if not reverse:
+        model = relation_model(sender)
+        if action == 'pre_clear':
+            instance._cleared_attribute_owners = list(
+                attribute_owners(model, recipe=instance)
+            )
+        elif action == 'post_clear':
+            owners = instance.__dict__.pop('_cleared_attribute_owners', [])
+            notify(sender, owners + [instance.user_id])
+        elif action in ('post_add', 'post_remove'):
+            owners = list(attribute_owners(model, pk__in=pk_set))
+            notify(sender, owners + [instance.user_id])
+    # Reverse side, e.g. tag.recipe_set.add(): the recipes are the targets
+    elif action == 'pre_clear':
+        instance._cleared_recipe_owners = list(
+            recipe_owners(**{relation_field(sender): instance})
+        )
+    elif action == 'post_clear':
+        notify(sender, instance.__dict__.pop('_cleared_recipe_owners', []))
+    elif action in ('post_add', 'post_remove'):
+        notify(sender, recipe_owners(pk__in=pk_set))
@@ -0,0 +1,200 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import (
+    Aggregate, Avg, Count, FloatField, Max, Min, Value, Window
+)
+from django.db.models.functions import Cast, Floor, Least, Rank
+from django.dispatch import receiver
+from .models import Tag, Ingredient, Recipe
+from .signals import recipes_changed
+
+FIELDS = ('price', 'time_took_min')
+PERCENTILES = (50, 90, 99)
+TOP = (
+    ('tags', Recipe.tags.through, 'tag'),
+    ('ingredients', Recipe.ingredients.through, 'ingredient'),
+)
+# Sections of the stats and the senders of recipes_changed that make
+# them stale; a Recipe change may also drop through rows on delete
+SECTIONS = {
+    'summary': (Recipe,),
+    'histograms': (Recipe,),
+    'tags': (Recipe, Tag, Recipe.tags.through),
+    'ingredients': (Recipe, Ingredient, Recipe.ingredients.through),
+}
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL's percentile_cont ordered-set aggregate"""
+    function = 'percentile_cont'
+    template = (
+        '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    )
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def _number(value):
+    """Return an aggregate as a float rounded to cents, keeping None"""
+    return None if value is None else round(float(value), 2)
+
+
+def _percentile(queryset, field, count, fraction):
+    """Return the interpolated percentile of field with one query"""
+    position = fraction * (count - 1)
+    lower = int(position)
+    values = list(queryset.order_by(field).values_list(
+        field, flat=True
+    )[lower:lower + 2])
+    low, high = float(values[0]), float(values[-1])
+    return low + (high - low) * (position - lower)
+
+
+def summary(queryset):
+    """Return the count and the min, max, mean and percentiles per field"""
+    aggregates = {'count': Count('id')}
+    postgres = connection.vendor == 'postgresql'
+    for field in FIELDS:
+        aggregates[f'{field}_min'] = Min(field)
+        aggregates[f'{field}_max'] = Max(field)
+        aggregates[f'{field}_avg'] = Avg(field)
+        if postgres:
+            for p in PERCENTILES:
+                aggregates[f'{field}_p{p}'] = PercentileCont(field, p / 100)
+    row = queryset.order_by().aggregate(**aggregates)
+
+    data = {'count': row['count']}
+    for field in FIELDS:
+        percentiles = {}
+        for p in PERCENTILES:
+            if postgres or not row['count']:
+                value = row.get(f'{field}_p{p}')
+            else:
+                # One query per percentile where there is no aggregate
+                value = _percentile(queryset, field, row['count'], p / 100)
+            percentiles[f'p{p}'] = _number(value)
+        data[field] = {
+            'min': _number(row[f'{field}_min']),
+            'max': _number(row[f'{field}_max']),
+            'avg': _number(row[f'{field}_avg']),
+            'percentiles': percentiles,
+        }
+    return data
+
+
+def histogram(queryset, field, low, high, buckets):
+    """Return equal width buckets of field between low and high"""
+    if low is None:
+        return []
+    width = (high - low) / buckets or 1
+    bucket = Least(
+        Floor((Cast(field, FloatField()) - low) / width),
+        Value(buckets - 1, FloatField())
+    )
+    counts = dict(queryset.order_by().annotate(
+        bucket=bucket
+    ).values_list('bucket').annotate(count=Count('id')))
+    return [
+        {
+            'start': _number(low + i * width),
+            'end': _number(low + (i + 1) * width),
+            'count': counts.get(i, 0),
+        }
+        for i in range(buckets)
+    ]
+
+
+def histograms(queryset, summary):
+    """Return the histograms of the fields within the summary's range"""
+    return {
+        field: histogram(
+            queryset, field, summary[field]['min'], summary[field]['max'],
+            settings.RECIPE_STATS_HISTOGRAM_BUCKETS
+        )
+        for field in FIELDS
+    }
+
+
+def top(queryset, through, column, limit):
+    """Return the most used related objects with their usage rank"""
+    rows = through.objects.filter(
+        recipe_id__in=queryset.order_by().values('id')
+    ).values_list(f'{column}_id', f'{column}__name').annotate(
+        count=Count('recipe_id'),
+        rank=Window(Rank(), order_by=Count('recipe_id').desc()),
+    ).order_by('-count', f'{column}__name')[:limit]
+    return [
+        {'id': pk, 'name': name, 'count': count, 'rank': rank}
+        for pk, name, count, rank in rows
+    ]
+
+
+def compute(queryset, sections):
+    """Return the given sections of the stats of queryset"""
+    data = {}
+    if 'summary' in sections or 'histograms' in sections:
+        data['summary'] = summary(queryset)
+    if 'histograms' in sections:
+        data['histograms'] = histograms(queryset, data['summary'])
+    for name, through, column in TOP:
+        if name in sections:
+            data[name] = top(
+                queryset, through, column, settings.RECIPE_STATS_TOP
+            )
+    return data
+
+
+def _key(user_id, section):
+    """Return the cache key of a stats section of a user"""
+    return f'recipe-stats:{user_id}:{section}'
+
+
+def recipe_stats(queryset, user_id, cached=True):
+    """Return the recipe stats, reusing the cached sections of the user
+
+    Only the sections made stale by a change since the last call are
+    recomputed, see invalidate_stats.
+    """
+    alias = settings.RECIPE_STATS_CACHE
+    if not cached or alias is None:
+        data = compute(queryset, SECTIONS)
+    else:
+        cache = caches[alias]
+        keys = {_key(user_id, section): section for section in SECTIONS}
+        data = {
+            keys[key]: value for key, value in cache.get_many(keys).items()
+        }
+        missing = set(SECTIONS) - set(data)
+        if missing:
+            fresh = compute(queryset, missing)
+            data.update(fresh)
+            cache.set_many({
+                _key(user_id, section): fresh[section]
+                for section in missing
+            }, settings.RECIPE_STATS_CACHE_TIMEOUT)
+    totals = data['summary']
+    result = {'count': totals['count']}
+    for field in FIELDS:
+        result[field] = dict(
+            totals[field], histogram=data['histograms'][field]
+        )
+    result['top_tags'] = data['tags']
+    result['top_ingredients'] = data['ingredients']
+    return result
+
+
+@receiver(recipes_changed)
+def invalidate_stats(sender, user_ids, **kwargs):
+    """Drop the cached stats sections the change made stale"""
+    alias = settings.RECIPE_STATS_CACHE
+    if alias is None:
+        return
+    stale = [
+        section for section, senders in SECTIONS.items() if sender in senders
+    ]
+    caches[alias].delete_many([
+        _key(user_id, section) for user_id in user_ids for section in stale
+    ])
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from PIL import Image
+
+BLOB_DIR = 'uploads/recipe/blobs'
+# File extension of the image formats Pillow reports, others use theirs
+EXTENSIONS = {'JPEG': 'jpg', 'MPO': 'jpg'}
+
+
+def blob_name(digest, extension):
+    """Return the sharded storage name of the blob with digest"""
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def blob_digest(name):
+    """Return the digest of a blob name, or None for other files"""
+    if not name or not name.startswith(BLOB_DIR + '/'):
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def format_extension(image_format):
+    """Return the file extension of a Pillow image format"""
+    return '.' + EXTENSIONS.get(image_format, image_format.lower())
+
+
+def image_extension(path):
+    """Return the file extension of the image at path, from its header
+
+    Raises ValueError when Pillow can't identify the file as an image.
+    """
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+    except Exception:
+        raise ValueError(f'{path} is not an image')
+    return format_extension(image_format)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Media storage keeping recipe images under their SHA-256
+
+    With RECIPE_IMAGE_CONTENT_ADDRESSED, a saved file is hashed while it
+    is written and stored once under blob_name(); saving the same bytes
+    again returns the stored name. The extension comes from the image
+    format, never from the name given, as blobs are served for good.
+    Otherwise files keep the name given.
+    """
+
+    def _save(self, name, content):
+        if not settings.RECIPE_IMAGE_CONTENT_ADDRESSED:
+            return super()._save(name, content)
+        directory = self.path(BLOB_DIR)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp:
+            try:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            except BaseException:
+                os.remove(tmp.name)
+                raise
+        try:
+            extension = image_extension(tmp.name)
+        except ValueError:
+            os.remove(tmp.name)
+            raise
+        name = blob_name(digest.hexdigest(), extension)
+        path = self.path(name)
+        if os.path.exists(path):
+            os.remove(tmp.name)
+            # Tells collect_blobs the blob is in use again
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp.name, path)
+            # Temporary files are private to their owner
+            os.chmod(path, self.file_permissions_mode or 0o644)
+        return name
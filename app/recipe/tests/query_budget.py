@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin to keep endpoints within a query budget"""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using='default'):
+        """Fail if the block runs more than `budget` queries"""
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f"{i}. {query['sql']}"
+                for i, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f"{executed} queries executed, budget is {budget}\n{queries}"
+            )
+
+    def assertConstantQueries(self, request, grow, budget):
+        """Check that `request` stays in budget before and after `grow`"""
+        with self.assertMaxQueries(budget) as small:
+            request()
+        grow()
+        with self.assertMaxQueries(budget) as large:
+            request()
+        self.assertEqual(
+            len(small.captured_queries), len(large.captured_queries),
+            "Query count depends on the result size"
+        )
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.backends.utils import CursorWrapper
+from django.test import TransactionTestCase
+from django.contrib.auth import get_user_model
+from recipe.asgi import RecipeReadApplication
+from recipe.models import Recipe, Tag
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+@contextmanager
+def connection_latency(seconds):
+    """Delay every query by seconds, in all threads"""
+    execute = CursorWrapper._execute
+
+    def delayed(self, *args, **kwargs):
+        time.sleep(seconds)
+        return execute(self, *args, **kwargs)
+    with mock.patch.object(CursorWrapper, '_execute', delayed):
+        yield
+
+
+async def request(app, method, path, token=None, body=b'', query=b'',
+                  headers=()):
+    """Send one request to an ASGI app, return (status, headers, body)"""
+    headers = [(b'host', b'testserver'), *headers]
+    if token:
+        headers.append((b'authorization', f'Token {token}'.encode()))
+    if body:
+        headers.append((b'content-type', b'application/json'))
+        headers.append((b'content-length', str(len(body)).encode()))
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'root_path': '',
+        'query_string': query, 'headers': headers,
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    content = b''.join(m.get('body', b'') for m in messages[1:])
+    return start['status'], dict(start['headers']), content
+
+
+class AsyncReadTest(TransactionTestCase):
+    """Test the async read path of the recipe API"""
+    def setUp(self):
+        cache.clear()
+        self.app = RecipeReadApplication(get_asgi_application())
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.token = Token.objects.create(user=self.user).key
+        self.recipe = Recipe.objects.create(
+            user=self.user, name="Dal", time_took_min=20, price=3
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="veg"))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def get(self, path, **kwargs):
+        """Return the async app's answer to a GET"""
+        return asyncio.run(
+            request(self.app, 'GET', path, token=self.token, **kwargs)
+        )
+
+    def test_same_responses(self):
+        """Test that async reads answer like the sync views"""
+        detail_url = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        for path in (RECIPE_URL, detail_url, TAG_URL):
+            status, headers, body = self.get(path, query=b'fields=id,name')
+            expected = self.client.get(f'{path}?fields=id,name')
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body), expected.json())
+            self.assertEqual(headers[b'etag'], expected['ETag'].encode())
+
+    def test_not_modified(self):
+        """Test that conditional GETs work on the async path"""
+        _, headers, _ = self.get(RECIPE_URL)
+        status, _, body = self.get(
+            RECIPE_URL, headers=[(b'if-none-match', headers[b'etag'])]
+        )
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    def test_unauthenticated(self):
+        """Test that a missing or wrong token is refused"""
+        for token in (None, 'wrong'):
+            status, _, _ = asyncio.run(
+                request(self.app, 'GET', RECIPE_URL, token=token)
+            )
+            self.assertEqual(status, 401)
+
+    def test_writes_use_django(self):
+        """Test that other requests are passed to the wrapped application"""
+        seen = []
+
+        async def django_app(scope, receive, send):
+            seen.append((scope['method'], scope['path']))
+            await send({
+                'type': 'http.response.start', 'status': 201, 'headers': []
+            })
+            await send({'type': 'http.response.body', 'body': b''})
+
+        app = RecipeReadApplication(django_app)
+        for method, path in (('POST', TAG_URL), ('GET', '/admin/')):
+            status, _, _ = asyncio.run(
+                request(app, method, path, token=self.token)
+            )
+            self.assertEqual(status, 201)
+        self.assertEqual(seen, [('POST', TAG_URL), ('GET', '/admin/')])
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'Set BENCHMARK=1 to run')
+@skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+class AsyncLoadTest(TransactionTestCase):
+    """Compare concurrent reads through Django's handler and the async path"""
+    concurrency = 200
+    # Round trip added to each query, as to a database on another host
+    latency = 0.005
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="bench@gmail.com",
+            name="bench",
+            password="testpassword"
+        )
+        self.token = Token.objects.create(user=user).key
+        Recipe.objects.bulk_create(
+            Recipe(user=user, name=f"recipe {i}", time_took_min=i, price=1)
+            for i in range(500)
+        )
+
+    def throughput(self, app):
+        """Return requests per second for concurrent recipe lists"""
+        async def run():
+            results = await asyncio.gather(*(
+                request(app, 'GET', RECIPE_URL, token=self.token,
+                        query=f'page_size=50&price_min={i % 2}'.encode())
+                for i in range(self.concurrency)
+            ))
+            # Django 3.0's handler closes responses outside the thread
+            # that ran the view, leaving its connection open
+            await sync_to_async(connections.close_all)()
+            return results
+        start = time.perf_counter()
+        with self.settings(RECIPE_RESPONSE_CACHE=None), \
+                connection_latency(self.latency):
+            results = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        self.assertTrue(all(status == 200 for status, _, _ in results))
+        return self.concurrency / elapsed
+
+    def test_throughput(self):
+        """Test that the async path serves more reads per second"""
+        django_app = get_asgi_application()
+        sync = self.throughput(django_app)
+        native = self.throughput(RecipeReadApplication(django_app))
+        print(f"\n{self.concurrency} concurrent lists: Django handler "
+              f"{sync:.0f} req/s, async path with "
+              f"{settings.RECIPE_ASYNC_DB_THREADS} threads {native:.0f} req/s")
+        self.assertGreater(native, sync)
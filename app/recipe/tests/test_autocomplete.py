@@ -0,0 +1,104 @@
+import time
+from unittest.mock import patch
+from django.conf import settings
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Tag, Ingredient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.autocomplete import PrefixIndex
+from recipe.tests.query_budget import QueryBudgetMixin
+
+TAG_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENT_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class AutocompleteApiTest(QueryBudgetMixin, TestCase):
+    """Test the tag and ingredient autocomplete endpoints"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        for name in ['Salt', 'saffron', 'Sugar', 'pepper']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+    def names(self, url, **params):
+        """Return the names suggested for the params"""
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [match['name'] for match in res.data]
+
+    def test_prefix_matches(self):
+        """Test that matches are case-insensitive and sorted"""
+        self.assertEqual(
+            self.names(INGREDIENT_AUTOCOMPLETE_URL, q='s'),
+            ['saffron', 'Salt', 'Sugar']
+        )
+        self.assertEqual(
+            self.names(INGREDIENT_AUTOCOMPLETE_URL, q='SA', limit=1),
+            ['saffron']
+        )
+        self.assertEqual(self.names(INGREDIENT_AUTOCOMPLETE_URL, q='x'), [])
+
+    def test_limited_to_user(self):
+        """Test that other users' names are not suggested"""
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        Ingredient.objects.create(user=user2, name="sesame")
+        Tag.objects.create(user=self.user, name="spicy")
+        self.assertEqual(
+            self.names(INGREDIENT_AUTOCOMPLETE_URL, q='se'), []
+        )
+        self.assertEqual(self.names(TAG_AUTOCOMPLETE_URL, q='s'), ['spicy'])
+
+    def test_no_queries_after_warm_up(self):
+        """Test that a warm keystroke does not hit the database"""
+        self.names(INGREDIENT_AUTOCOMPLETE_URL, q='s')
+        with self.assertMaxQueries(0):
+            self.names(INGREDIENT_AUTOCOMPLETE_URL, q='sa')
+
+    def test_invalidated_on_create_and_delete(self):
+        """Test that created and deleted names are reflected"""
+        self.names(INGREDIENT_AUTOCOMPLETE_URL, q='s')
+        self.client.post(reverse('recipe:ingredient-list'), {'name': 'Soy'})
+        self.assertIn('Soy', self.names(INGREDIENT_AUTOCOMPLETE_URL, q='so'))
+
+        Ingredient.objects.get(name='Salt').delete()
+        self.assertNotIn(
+            'Salt', self.names(INGREDIENT_AUTOCOMPLETE_URL, q='s')
+        )
+
+    def test_expires_after_ttl(self):
+        """Test that writes missed by this process show up after the TTL"""
+        self.names(INGREDIENT_AUTOCOMPLETE_URL, q='s')
+        # A queryset update sends no signal, like a write in another process
+        Ingredient.objects.filter(name='Salt').update(name='Sage')
+        self.assertIn('Salt', self.names(INGREDIENT_AUTOCOMPLETE_URL, q='s'))
+
+        later = time.monotonic() + settings.RECIPE_AUTOCOMPLETE_TTL + 1
+        with patch('recipe.index.time.monotonic', return_value=later):
+            names = self.names(INGREDIENT_AUTOCOMPLETE_URL, q='s')
+        self.assertIn('Sage', names)
+        self.assertNotIn('Salt', names)
+
+    def test_invalid_limit(self):
+        """Test that a malformed limit is rejected"""
+        res = self.client.get(INGREDIENT_AUTOCOMPLETE_URL, {'limit': 'a'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prefix_index(self):
+        """Test the prefix index on its own"""
+        index = PrefixIndex([(1, 'b'), (2, 'ab'), (3, 'abc'), (4, 'B2')])
+        self.assertEqual(
+            index.complete('b', 10),
+            [{'id': 1, 'name': 'b'}, {'id': 4, 'name': 'B2'}]
+        )
+        self.assertEqual(len(index.complete('', 3)), 3)
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from recipe.blobs import collect_blobs
+from recipe.models import ImageBlob, Recipe
+from recipe.storage import BLOB_DIR
+from recipe.tests.test_images import jpeg
+
+
+class ImageBlobTest(TestCase):
+    """Test the content-addressed storage of recipe images"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name, RECIPE_IMAGE_CONTENT_ADDRESSED=True
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.image = jpeg()
+        self.digest = hashlib.sha256(self.image).hexdigest()
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def recipe(self, content=None):
+        """Return a recipe with an image of content"""
+        recipe = Recipe.objects.create(
+            user=self.user, name="Dal", time_took_min=20, price=3
+        )
+        recipe.image.save('photo.JPG', ContentFile(content or self.image))
+        return recipe
+
+    def test_stored_once(self):
+        """Test that equal images share one sharded blob"""
+        first, second = self.recipe(), self.recipe()
+        name = f'{BLOB_DIR}/{self.digest[:2]}/{self.digest[2:4]}/' \
+            f'{self.digest}.jpg'
+        self.assertEqual(first.image.name, name)
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(os.listdir(os.path.dirname(first.image.path)),
+                         [f'{self.digest}.jpg'])
+        self.assertEqual(ImageBlob.objects.get().refs, 2)
+
+    def test_extension_from_content(self):
+        """Test that the blob extension follows the image format"""
+        recipe = self.recipe()
+        content = jpeg((2, 2), image_format='GIF') + b'<script></script>'
+        recipe.image.save('evil.html', ContentFile(content))
+        self.assertTrue(recipe.image.name.endswith('.gif'))
+        res = self.client.get(f'/media/{recipe.image.name}')
+        self.assertEqual(res['Content-Type'], 'image/gif')
+
+    def test_not_an_image(self):
+        """Test that files that aren't images are not stored"""
+        recipe = self.recipe()
+        with self.assertRaises(ValueError):
+            recipe.image.save('page.html', ContentFile(b'<html></html>'))
+        self.assertEqual(
+            os.listdir(self.storage.path(BLOB_DIR)), [self.digest[:2]]
+        )
+
+    def test_references(self):
+        """Test that replacing and deleting images release the blob"""
+        first, second = self.recipe(), self.recipe()
+        first.image.save('other.jpg', ContentFile(jpeg((10, 10))))
+        self.assertEqual(ImageBlob.objects.get(pk=self.digest).refs, 1)
+        second.delete()
+        self.assertEqual(ImageBlob.objects.get(pk=self.digest).refs, 0)
+        first.name = 'renamed'
+        first.save()
+        self.assertEqual(ImageBlob.objects.exclude(
+            pk=self.digest
+        ).get().refs, 1)
+
+    def test_collect(self):
+        """Test that unused blobs are deleted after the grace period"""
+        recipe = self.recipe()
+        path = recipe.image.path
+        recipe.delete()
+        self.assertEqual(collect_blobs(self.storage, grace=60), 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(collect_blobs(self.storage, grace=-1), 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_collect_orphaned_file(self):
+        """Test that blob files without a row are deleted"""
+        path = self.recipe().image.path
+        ImageBlob.objects.all().delete()
+        self.assertEqual(collect_blobs(self.storage, grace=-1), 1)
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(RECIPE_IMAGE_CONTENT_ADDRESSED=False)
+    def test_disabled(self):
+        """Test that images keep their own names without the mode"""
+        first, second = self.recipe(), self.recipe()
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('uploads/recipe/'))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_serve_immutable(self):
+        """Test that blobs are served with immutable cache headers"""
+        recipe = self.recipe()
+        res = self.client.get(f'/media/{recipe.image.name}')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.image)
+        self.assertIn('immutable', res['Cache-Control'])
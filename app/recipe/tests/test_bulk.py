@@ -0,0 +1,238 @@
+from decimal import Decimal
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient, VersionStamp
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.tests.query_budget import QueryBudgetMixin
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_payload(name, **params):
+    """Return a recipe payload for the bulk endpoint"""
+    data = {'name': name, 'time_took_min': 10, 'price': '5.00'}
+    data.update(params)
+    return data
+
+
+class BulkRecipeApiTest(QueryBudgetMixin, TestCase):
+    """Test creating and updating recipes in bulk"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f"tag {i}")
+            for i in range(3)
+        ]
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name="oil"
+        )
+
+    def post(self, items):
+        """Post items to the bulk endpoint"""
+        return self.client.post(BULK_URL, items, format='json')
+
+    def test_other_owners_notified(self):
+        """Test that using another user's tag bumps its owner's stamp"""
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        version = VersionStamp.objects.get(user=self.user).version
+        self.client.force_authenticate(user2)
+        res = self.post([recipe_payload("soup", tags=[self.tags[0].id])])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertGreater(
+            VersionStamp.objects.get(user=self.user).version, version
+        )
+
+    def test_bulk_create(self):
+        """Test creating recipes with their relations"""
+        tag_ids = [tag.id for tag in self.tags]
+        res = self.post([
+            recipe_payload("first", tags=tag_ids[:2]),
+            recipe_payload("second", ingredients=[self.ingredient.id]),
+        ])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first = Recipe.objects.get(id=res.data[0]['id'])
+        second = Recipe.objects.get(id=res.data[1]['id'])
+        self.assertEqual(first.user, self.user)
+        self.assertEqual(sorted(res.data[0]['tags']), tag_ids[:2])
+        self.assertEqual(
+            sorted(first.tags.values_list('id', flat=True)), tag_ids[:2]
+        )
+        self.assertEqual(list(second.ingredients.all()), [self.ingredient])
+        self.assertEqual(second.price, Decimal('5.00'))
+
+    def test_bulk_update(self):
+        """Test that items with an id update the given fields only"""
+        recipe = Recipe.objects.create(
+            user=self.user, name="old", time_took_min=3, price=2
+        )
+        recipe.tags.add(self.tags[0])
+        recipe.ingredients.add(self.ingredient)
+        res = self.post([
+            {'id': recipe.id, 'name': 'new', 'tags': [self.tags[1].id]},
+        ])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'new')
+        self.assertEqual(recipe.time_took_min, 3)
+        self.assertEqual(list(recipe.tags.all()), [self.tags[1]])
+        self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+
+    def test_per_item_errors(self):
+        """Test that invalid items are reported without failing others"""
+        other = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        foreign = Recipe.objects.create(
+            user=other, name="foreign", time_took_min=3, price=2
+        )
+        res = self.post([
+            recipe_payload("valid"),
+            recipe_payload("bad tag", tags=[999999]),
+            {'name': 'missing fields'},
+            {'id': foreign.id, 'name': 'stolen'},
+        ])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('id', res.data[0])
+        self.assertIn('tags', res.data[1]['errors'])
+        self.assertIn('price', res.data[2]['errors'])
+        self.assertIn('id', res.data[3]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.name, 'foreign')
+
+    def test_repeated_id(self):
+        """Test that a recipe updated twice in a batch is an item error"""
+        recipe = Recipe.objects.create(
+            user=self.user, name="old", time_took_min=3, price=2
+        )
+        res = self.post([
+            {'id': recipe.id, 'name': 'first', 'tags': [self.tags[0].id]},
+            {'id': recipe.id, 'name': 'second', 'tags': [self.tags[0].id]},
+        ])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['id'], recipe.id)
+        self.assertIn('id', res.data[1]['errors'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'first')
+        self.assertEqual(list(recipe.tags.all()), [self.tags[0]])
+
+    def test_invalid_payload(self):
+        """Test that a non-list body or an oversized batch is rejected"""
+        res = self.post(recipe_payload("single"))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(RECIPE_BULK_MAX_ITEMS=1):
+            res = self.post([recipe_payload("a"), recipe_payload("b")])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_query_budget(self):
+        """Test the query budget of a mixed create and update batch"""
+        tag_ids = [tag.id for tag in self.tags]
+        recipe = Recipe.objects.create(
+            user=self.user, name="old", time_took_min=3, price=2
+        )
+        with self.assertMaxQueries(15):
+            self.post([
+                {'id': recipe.id, 'tags': tag_ids},
+                recipe_payload("new", tags=tag_ids),
+            ])
+
+    @skipUnless(
+        connection.features.can_return_rows_from_bulk_insert,
+        'Recipes are inserted one by one without RETURNING support'
+    )
+    def test_bulk_queries_constant(self):
+        """Test that the query count does not grow with the batch"""
+        tag_ids = [tag.id for tag in self.tags]
+
+        def create(size):
+            return self.post([
+                recipe_payload(f"recipe {i}", tags=tag_ids,
+                               ingredients=[self.ingredient.id])
+                for i in range(size)
+            ])
+
+        with self.assertMaxQueries(13) as small:
+            create(2)
+        with self.assertMaxQueries(13) as large:
+            create(50)
+        self.assertEqual(
+            len(small.captured_queries), len(large.captured_queries)
+        )
+
+
+class BulkRecipeAttrApiTest(QueryBudgetMixin, TestCase):
+    """Test resolving tags and ingredients by name in bulk"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_upsert_names(self):
+        """Test that names are resolved or created in input order"""
+        salt = Ingredient.objects.create(user=self.user, name="salt")
+        url = reverse('recipe:ingredient-bulk')
+        with self.assertMaxQueries(3):
+            res = self.client.post(
+                url, ['pepper', 'salt', 'oil', 'pepper'], format='json'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['name'] for item in res.data],
+            ['pepper', 'salt', 'oil', 'pepper']
+        )
+        self.assertEqual(res.data[1]['id'], salt.id)
+        self.assertEqual(res.data[0]['id'], res.data[3]['id'])
+        pepper = Ingredient.objects.get(id=res.data[0]['id'])
+        self.assertEqual(pepper.name, 'pepper')
+        self.assertEqual(pepper.user, self.user)
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+    def test_existing_name_of_other_user(self):
+        """Test that globally unique names resolve to the existing row"""
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        tag = Tag.objects.create(user=user2, name="vegan")
+        res = self.client.post(
+            reverse('recipe:tag-bulk'), ['vegan'], format='json'
+        )
+        self.assertEqual(res.data, [{'id': tag.id, 'name': 'vegan'}])
+
+    def test_upsert_invalidates_autocomplete(self):
+        """Test that created names show up in autocomplete"""
+        url = reverse('recipe:tag-autocomplete')
+        self.client.get(url, {'q': 'b'})
+        self.client.post(
+            reverse('recipe:tag-bulk'), ['breakfast'], format='json'
+        )
+        res = self.client.get(url, {'q': 'b'})
+        self.assertEqual([tag['name'] for tag in res.data], ['breakfast'])
+
+    def test_invalid_names(self):
+        """Test that invalid payloads are rejected"""
+        url = reverse('recipe:tag-bulk')
+        for payload in ({'name': 'x'}, [''], ['x' * 256]):
+            res = self.client.post(url, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import metrics
+from recipe.tests.query_budget import QueryBudgetMixin
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def recipe_detail_url(id):
+    """Return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[id])
+
+
+class ResponseCacheTest(QueryBudgetMixin, TestCase):
+    """Test the response cache of the recipe endpoints"""
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name="veg")
+        self.recipe = Recipe.objects.create(
+            user=self.user, name="Dal", time_took_min=20, price=3
+        )
+        self.recipe.tags.add(self.tag)
+        metrics.reset()
+
+    def test_hit(self):
+        """Test that a repeated read is served without the queryset"""
+        for url in (RECIPE_URL, recipe_detail_url(self.recipe.id), TAG_URL):
+            res = self.client.get(url)
+            with self.assertMaxQueries(1):
+                cached = self.client.get(url)
+            self.assertEqual(cached.status_code, status.HTTP_200_OK)
+            self.assertEqual(cached.content, res.content)
+        self.assertEqual(
+            metrics.snapshot(), {'recipe_cache.hit': 3, 'recipe_cache.miss': 3}
+        )
+
+    def test_normalized_params(self):
+        """Test that the order of listed ids does not matter"""
+        other = Tag.objects.create(user=self.user, name="quick")
+        self.client.get(RECIPE_URL, {'tags': f'{self.tag.id},{other.id}'})
+        self.client.get(RECIPE_URL, {'tags': f'{other.id},{self.tag.id}'})
+        self.assertEqual(metrics.snapshot()['recipe_cache.hit'], 1)
+
+    def test_invalidated_by_signals(self):
+        """Test that model and m2m changes are visible right away"""
+        self.client.get(RECIPE_URL)
+        self.recipe.tags.clear()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['tags'], [])
+
+        self.client.get(TAG_URL)
+        self.tag.name = "vegan"
+        self.tag.save()
+        res = self.client.get(TAG_URL)
+        self.assertEqual(res.data['results'][0]['name'], 'vegan')
+        self.assertNotIn('recipe_cache.hit', metrics.snapshot())
+
+    def test_per_user(self):
+        """Test that users never see each other's cached reads"""
+        self.client.get(TAG_URL)
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        self.client.force_authenticate(user2)
+        res = self.client.get(TAG_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_invalidated_by_other_users(self):
+        """Test that other users' recipes using a tag are visible"""
+        self.client.get(TAG_URL)
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        recipe = Recipe.objects.create(
+            user=user2, name="Soup", time_took_min=5, price=2
+        )
+        recipe.tags.add(self.tag)
+        res = self.client.get(TAG_URL)
+        self.assertEqual(res.data['results'][0]['recipe_count'], 2)
+        self.assertNotIn('recipe_cache.hit', metrics.snapshot())
+
+    def test_disabled(self):
+        """Test that the cache can be switched off"""
+        with self.settings(RECIPE_RESPONSE_CACHE=None):
+            self.client.get(RECIPE_URL)
+            self.client.get(RECIPE_URL)
+        self.assertEqual(metrics.snapshot(), {})
@@ -0,0 +1,113 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, VersionStamp
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.tests.query_budget import QueryBudgetMixin
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def recipe_detail_url(id):
+    """Return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[id])
+
+
+class ConditionalGetTest(QueryBudgetMixin, TestCase):
+    """Test ETag and Last-Modified handling of the recipe endpoints"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, name="Dal", time_took_min=20, price=3
+        )
+
+    def assertNotModified(self, url, etag):
+        """Assert that url answers 304 for etag with one query"""
+        with self.assertMaxQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_not_modified(self):
+        """Test that an unchanged list and detail answer 304"""
+        for url in (RECIPE_URL, recipe_detail_url(self.recipe.id), TAG_URL):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIn('Last-Modified', res)
+            self.assertNotModified(url, res['ETag'])
+
+    def test_changes_invalidate(self):
+        """Test that recipe and tag changes produce a new ETag"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="veg"))
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+        etag = self.client.get(TAG_URL)['ETag']
+        Tag.objects.filter(user=self.user).get().delete()
+        res = self.client.get(TAG_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_per_url(self):
+        """Test that different query strings get different ETags"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+        res = self.client.get(
+            RECIPE_URL, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_other_users_do_not_invalidate(self):
+        """Test that another user's changes keep the ETag"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        Recipe.objects.create(
+            user=user2, name="Soup", time_took_min=5, price=2
+        )
+        self.assertNotModified(RECIPE_URL, etag)
+
+    def test_other_users_recipes_on_own_tags(self):
+        """Test that other users' recipes using a tag change its ETag"""
+        tag = Tag.objects.create(user=self.user, name="veg")
+        url = f'{TAG_URL}?assigned_only=1'
+        res = self.client.get(url)
+        self.assertEqual(res.data['results'], [])
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        client2 = APIClient()
+        client2.force_authenticate(user2)
+        created = client2.post(RECIPE_URL, {
+            'name': 'Soup', 'time_took_min': 5, 'price': 2, 'tags': [tag.id]
+        })
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [tag.id]
+        )
+
+        client2.delete(recipe_detail_url(created.data['id']))
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+    def test_missing_stamp(self):
+        """Test that a user without a stamp gets one on the first read"""
+        VersionStamp.objects.filter(user=self.user).delete()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(VersionStamp.objects.filter(user=self.user).exists())
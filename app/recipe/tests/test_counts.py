@@ -0,0 +1,119 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+TAG_URL = reverse('recipe:tag-list')
+
+
+class RecipeCountTest(TestCase):
+    """Test the recipe_count of tags and ingredients"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("veg", "hot", "quick")
+        ]
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, name=f"recipe {i}", time_took_min=1, price=1
+            )
+            for i in range(3)
+        ]
+
+    def counts(self, model=Tag):
+        """Return the recipe_count per name"""
+        return dict(model.objects.values_list('name', 'recipe_count'))
+
+    def test_forward_changes(self):
+        """Test adding, removing and clearing a recipe's tags"""
+        veg, hot, quick = self.tags
+        self.recipes[0].tags.add(veg, hot)
+        self.recipes[0].tags.add(veg)
+        self.recipes[1].tags.add(veg)
+        self.assertEqual(self.counts(), {'veg': 2, 'hot': 1, 'quick': 0})
+        self.recipes[0].tags.remove(veg, quick)
+        self.assertEqual(self.counts(), {'veg': 1, 'hot': 1, 'quick': 0})
+        self.recipes[0].tags.clear()
+        self.assertEqual(self.counts(), {'veg': 1, 'hot': 0, 'quick': 0})
+
+    def test_reverse_changes(self):
+        """Test adding, removing and clearing a tag's recipes"""
+        veg = self.tags[0]
+        veg.recipe_set.add(*self.recipes)
+        self.assertEqual(self.counts()['veg'], 3)
+        veg.recipe_set.remove(self.recipes[0])
+        self.assertEqual(self.counts()['veg'], 2)
+        veg.recipe_set.clear()
+        self.assertEqual(self.counts()['veg'], 0)
+
+    def test_recipe_deleted(self):
+        """Test that deleting a recipe decrements its relations"""
+        rice = Ingredient.objects.create(user=self.user, name="rice")
+        self.recipes[0].tags.add(self.tags[0])
+        self.recipes[0].ingredients.add(rice)
+        self.recipes[1].ingredients.add(rice)
+        self.recipes[0].delete()
+        self.assertEqual(self.counts()['veg'], 0)
+        self.assertEqual(self.counts(Ingredient), {'rice': 1})
+
+    def test_save_keeps_count(self):
+        """Test that saving a stale instance keeps the count"""
+        veg = self.tags[0]
+        self.recipes[0].tags.add(veg)
+        veg.name = "vegan"
+        veg.save()
+        self.assertEqual(self.counts()['vegan'], 1)
+
+    def test_bulk_endpoint(self):
+        """Test that bulk recipe writes adjust the counts"""
+        veg, hot, _ = self.tags
+        self.recipes[0].tags.add(veg)
+        self.client.post(reverse('recipe:recipe-bulk'), [
+            {'id': self.recipes[0].id, 'tags': [hot.id]},
+            {'name': 'new', 'time_took_min': 1, 'price': 1,
+             'tags': [veg.id, hot.id]},
+        ], format='json')
+        self.assertEqual(self.counts(), {'veg': 1, 'hot': 2, 'quick': 0})
+
+    def test_assigned_only_and_popularity(self):
+        """Test filtering on and ordering by recipe_count"""
+        veg, hot, _ = self.tags
+        veg.recipe_set.add(*self.recipes)
+        hot.recipe_set.add(self.recipes[0])
+        res = self.client.get(
+            TAG_URL, {'assigned_only': 1, 'ordering': '-recipe_count'}
+        )
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count'])
+             for tag in res.data['results']],
+            [('veg', 3), ('hot', 1)]
+        )
+
+    def test_not_nested_in_recipes(self):
+        """Test that recipes of other users don't show the tag's count"""
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            name="other",
+            password="testpassword"
+        )
+        recipe = Recipe.objects.create(
+            user=other, name="theirs", time_took_min=1, price=1
+        )
+        recipe.tags.add(self.tags[0])
+        client = APIClient()
+        client.force_authenticate(other)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        before = client.get(url).data['tags']
+        self.assertEqual(before, [{'id': self.tags[0].id, 'name': 'veg'}])
+
+        # Changes the count without notifying the other user
+        self.recipes[0].tags.add(self.tags[0])
+        self.assertEqual(client.get(url).data['tags'], before)
@@ -0,0 +1,77 @@
+import json
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeDetailSerializer
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.tests.query_budget import QueryBudgetMixin
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTest(QueryBudgetMixin, TestCase):
+    """Test streaming the recipe book"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name="veg")
+        ingredient = Ingredient.objects.create(user=self.user, name="rice")
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user, name=f"recipe {i}", time_took_min=i, price=2
+            )
+            recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+    def export(self, **params):
+        """Return the streamed export body"""
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b''.join(res.streaming_content).decode()
+
+    def expected(self):
+        """Return the recipes as the detail serializer renders them"""
+        recipes = Recipe.objects.filter(user=self.user)
+        return json.loads(json.dumps(
+            RecipeDetailSerializer(recipes, many=True).data
+        ))
+
+    def test_json_array(self):
+        """Test exporting a JSON array"""
+        res, body = self.export()
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(body), self.expected())
+
+    def test_ndjson(self):
+        """Test exporting one recipe per line"""
+        res, body = self.export(output='ndjson')
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = body.splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected())
+
+    def test_filtered_and_empty(self):
+        """Test that filters apply and an empty export is valid JSON"""
+        _, body = self.export(fields='name', search='recipe 3')
+        self.assertEqual(json.loads(body), [{'name': 'recipe 3'}])
+        Recipe.objects.all().delete()
+        _, body = self.export()
+        self.assertEqual(json.loads(body), [])
+
+    def test_chunked_queries(self):
+        """Test that relations are fetched once per chunk"""
+        with self.settings(RECIPE_EXPORT_CHUNK_SIZE=2):
+            with self.assertMaxQueries(7):
+                self.export()
+
+    def test_invalid_output(self):
+        """Test that an unknown output is rejected"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,78 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.tests.query_budget import QueryBudgetMixin
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def recipe_detail_url(id):
+    """Return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[id])
+
+
+class SparseFieldsTest(QueryBudgetMixin, TestCase):
+    """Test selecting response fields with ?fields= and ?omit="""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, name="Dal", time_took_min=20, price=3
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="veg"))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="lentils")
+        )
+
+    def test_fields_selects_scalars(self):
+        """Test that only scalar fields need no related queries"""
+        with self.assertMaxQueries(2):
+            res = self.client.get(RECIPE_URL, {'fields': 'id,name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'], [{'id': self.recipe.id, 'name': 'Dal'}]
+        )
+
+    def test_omit_drops_prefetch(self):
+        """Test that omitting a relation skips its prefetch"""
+        with self.assertMaxQueries(3):
+            res = self.client.get(RECIPE_URL, {'omit': 'tags'})
+        result = res.data['results'][0]
+        self.assertNotIn('tags', result)
+        self.assertEqual(result['ingredients'], [
+            self.recipe.ingredients.get().id
+        ])
+
+    def test_detail_fields(self):
+        """Test that the detail keeps nested objects when selected"""
+        res = self.client.get(
+            recipe_detail_url(self.recipe.id), {'fields': 'name,tags'}
+        )
+        self.assertEqual(res.data, {
+            'name': 'Dal',
+            'tags': [{'id': self.recipe.tags.get().id, 'name': 'veg'}],
+        })
+
+    def test_tag_fields(self):
+        """Test that tag lists accept the field selection"""
+        res = self.client.get(
+            reverse('recipe:tag-list'), {'omit': 'id,recipe_count'}
+        )
+        self.assertEqual(res.data['results'], [{'name': 'veg'}])
+
+    def test_writes_ignore_fields(self):
+        """Test that field selection does not affect writes"""
+        res = self.client.patch(
+            recipe_detail_url(self.recipe.id) + '?fields=id',
+            {'name': 'Dal tadka'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Dal tadka')
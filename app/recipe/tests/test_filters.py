@@ -0,0 +1,129 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.index import registry, RecipeIndex
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, name):
+    """Create & return a sample recipe"""
+    return Recipe.objects.create(
+        user=user, name=name, time_took_min=10, price=5.00
+    )
+
+
+class RecipeFilterTest(TestCase):
+    """Test the tag and ingredient filters of the recipe list"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f"tag {i}")
+            for i in range(4)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f"ingredient {i}")
+            for i in range(4)
+        ]
+        self.recipes = []
+        for i in range(12):
+            recipe = sample_recipe(self.user, f"recipe {i}")
+            recipe.tags.set(t for j, t in enumerate(self.tags) if i & 1 << j)
+            recipe.ingredients.set(self.ingredients[:i % 5])
+            self.recipes.append(recipe)
+        registry.invalidate([self.user.id])
+
+    def ids(self, **params):
+        """Return the recipe ids of a filtered list request"""
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def both_paths(self, **params):
+        """Return the ids from the SQL path and from the index path"""
+        sql = self.ids(**params)
+        with override_settings(RECIPE_FILTER_INDEX=True):
+            indexed = self.ids(**params)
+        return sql, indexed
+
+    def test_any_returns_unique_recipes(self):
+        """Test that recipes matching several tags are returned once"""
+        tags = f"{self.tags[0].id},{self.tags[1].id}"
+        for ids in self.both_paths(tags=tags):
+            self.assertEqual(len(ids), len(set(ids)))
+            self.assertIn(self.recipes[3].id, ids)
+            self.assertNotIn(self.recipes[4].id, ids)
+
+    def test_all_requires_every_tag(self):
+        """Test that match=all returns recipes having every tag"""
+        tags = f"{self.tags[0].id},{self.tags[1].id}"
+        for ids in self.both_paths(tags=tags, match='all'):
+            self.assertEqual(ids, [self.recipes[3].id, self.recipes[7].id,
+                                   self.recipes[11].id])
+
+    def test_index_matches_sql(self):
+        """Test that the index answers exactly like the SQL path"""
+        tag_ids = [t.id for t in self.tags]
+        ingredient_ids = [i.id for i in self.ingredients]
+        cases = [
+            {'tags': f"{tag_ids[2]}"},
+            {'tags': f"{tag_ids[0]},{tag_ids[3]}"},
+            {'ingredients': f"{ingredient_ids[1]},{ingredient_ids[3]}"},
+            {'tags': f"{tag_ids[1]}", 'ingredients': f"{ingredient_ids[0]}"},
+            {'tags': '999999'},
+        ]
+        for params in cases:
+            for match in ('any', 'all'):
+                sql, indexed = self.both_paths(match=match, **params)
+                self.assertEqual(sql, indexed, (params, match))
+
+    @override_settings(RECIPE_FILTER_INDEX=True)
+    def test_index_invalidated_on_change(self):
+        """Test that relation changes are visible to the index"""
+        tag = self.tags[0]
+        recipe = self.recipes[0]
+        self.assertNotIn(recipe.id, self.ids(tags=tag.id))
+
+        recipe.tags.add(tag)
+        self.assertIn(recipe.id, self.ids(tags=tag.id))
+
+        tag.recipe_set.remove(recipe)
+        self.assertNotIn(recipe.id, self.ids(tags=tag.id))
+
+        tag.recipe_set.add(recipe)
+        tag.recipe_set.clear()
+        self.assertEqual(self.ids(tags=tag.id), [])
+
+    def test_index_invalidated_on_delete(self):
+        """Test that deleted recipes and tags leave the index"""
+        tag_id = self.tags[0].id
+        recipe_id = self.recipes[1].id
+        self.assertIn(recipe_id, registry.get(self.user.id).tags[tag_id])
+
+        self.recipes[1].delete()
+        self.assertNotIn(recipe_id, registry.get(self.user.id).tags[tag_id])
+        self.tags[0].delete()
+        self.assertNotIn(tag_id, registry.get(self.user.id).tags)
+
+    def test_invalid_params(self):
+        """Test that malformed filters are rejected"""
+        res = self.client.get(RECIPE_URL, {'tags': 'a,b'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_match(self):
+        """Test the set operations of the index"""
+        index = RecipeIndex({1: frozenset({1, 2}), 2: frozenset({2, 3})}, {})
+        self.assertEqual(index.match([1, 2]), {1, 2, 3})
+        self.assertEqual(index.match([1, 2], match_all=True), {2})
+        self.assertEqual(index.match([1, 4], match_all=True), set())
@@ -0,0 +1,209 @@
+import os
+import tempfile
+from concurrent.futures import Future
+from io import BytesIO
+from unittest.mock import patch
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from PIL import Image, ImageFile
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import metrics
+from recipe import images
+from recipe.models import Recipe
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def image_upload_url(id):
+    """Return url for image upload"""
+    return reverse('recipe:recipe-upload-image', args=[id])
+
+
+def jpeg(size=(800, 400), image_format='JPEG', **options):
+    """Return the bytes of an image of size, a JPEG by default"""
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+class ImageVariantsTest(TestCase):
+    """Test the resized variants of recipe images"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name, RECIPE_IMAGE_WORKERS=0,
+            RECIPE_RESPONSE_CACHE=None
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, name="Dal", time_took_min=20, price=3
+        )
+
+    def upload(self, content=None):
+        """Upload a JPEG to the recipe, returning the response"""
+        image = ContentFile(content or jpeg(), name='dal.jpg')
+        return self.client.post(
+            image_upload_url(self.recipe.id), {'image': image},
+            format='multipart'
+        )
+
+    def test_upload_renders_variants(self):
+        """Test that an upload gets its variants in every format"""
+        res = self.upload()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        directory = images.variants_dir(self.recipe.image.name)
+        self.assertEqual(self.recipe.image_variants, directory)
+        self.assertEqual(
+            res.data['images']['thumb']['webp'],
+            f'/media/{directory}/thumb.webp'
+        )
+        path = os.path.join(images.default_storage.location, directory)
+        with Image.open(os.path.join(path, 'thumb.jpeg')) as thumb:
+            self.assertEqual(thumb.size, (160, 80))
+        with Image.open(os.path.join(path, 'large.webp')) as large:
+            # Smaller images are not enlarged
+            self.assertEqual(large.size, (800, 400))
+
+    def test_original_until_ready(self):
+        """Test that the original stands in while variants are pending"""
+        with patch('recipe.views.schedule_variants'):
+            self.upload()
+        self.recipe.refresh_from_db()
+        original = f'/media/{self.recipe.image.name}'
+        res = self.client.get(RECIPE_URL)
+        urls = res.data['results'][0]['images']
+        self.assertEqual(urls['original'], original)
+        self.assertEqual(urls['medium'], {'webp': original, 'jpeg': original})
+
+    def test_list_and_detail(self):
+        """Test that list and detail return the variant URLs"""
+        self.upload()
+        self.recipe.refresh_from_db()
+        expected = images.image_urls(
+            self.recipe.image.name, self.recipe.image_variants
+        )
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['images'], expected)
+        detail = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        self.assertEqual(self.client.get(detail).data['images'], expected)
+
+    def test_replaced_image(self):
+        """Test that variants of a replaced image are not recorded"""
+        self.upload()
+        self.recipe.refresh_from_db()
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        self.upload(jpeg((400, 200)))
+        future = Future()
+        future.set_result(None)
+        self.assertFalse(images.finish_variants(stale, future))
+
+    def test_no_image(self):
+        """Test that recipes without an image have no URLs"""
+        res = self.client.get(RECIPE_URL)
+        self.assertIsNone(res.data['results'][0]['images'])
+
+
+class ImageValidationTest(TestCase):
+    """Test validating uploaded images from their header"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schedule = patch('recipe.views.schedule_variants')
+        schedule.start()
+        self.addCleanup(schedule.stop)
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, name="Dal", time_took_min=20, price=3
+        )
+        metrics.reset()
+
+    def upload(self, content, name='dal.jpg'):
+        """Upload content as the recipe's image, returning the response"""
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': ContentFile(content, name=name)}, format='multipart'
+        )
+
+    def test_not_decoded(self):
+        """Test that a valid upload is accepted without decoding it"""
+        with patch.object(ImageFile.ImageFile, 'load') as load:
+            for image_format in ('JPEG', 'PNG', 'WEBP'):
+                res = self.upload(jpeg(image_format=image_format))
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+        load.assert_not_called()
+        counters = metrics.snapshot()
+        self.assertEqual(counters['recipe_images.validated'], 3)
+        self.assertGreater(counters['recipe_images.validation_seconds'], 0)
+        self.assertNotIn('recipe_images.rejected', counters)
+
+    def test_invalid(self):
+        """Test that files that aren't images are rejected"""
+        res = self.upload(b'not an image at all')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'], ['Upload a valid image.'])
+        self.assertEqual(metrics.snapshot()['recipe_images.rejected'], 1)
+
+    @override_settings(RECIPE_IMAGE_CONTENT_ADDRESSED=False)
+    def test_renamed_to_format(self):
+        """Test that an image is stored under its format's extension"""
+        content = jpeg((2, 2), image_format='GIF') + b'<script></script>'
+        res = self.upload(content, name='x.html')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.gif'))
+
+    def test_format(self):
+        """Test that formats outside the accepted ones are rejected"""
+        res = self.upload(jpeg(image_format='BMP'), name='dal.bmp')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'], ['BMP images are not accepted.'])
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100000)
+    def test_pixel_limit(self):
+        """Test that images with too many pixels are rejected"""
+        with patch.object(ImageFile.ImageFile, 'load') as load:
+            res = self.upload(jpeg((800, 400)))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        load.assert_not_called()
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_UPLOAD_MAX_SIZE=100)
+    def test_byte_limit(self):
+        """Test that images over the byte limit are rejected"""
+        res = self.upload(jpeg())
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_orientation(self):
+        """Test that the size is reported as displayed"""
+        exif = Image.Exif()
+        exif[images.ORIENTATION] = 6
+        rotated = jpeg((800, 400), exif=exif.tobytes())
+        self.assertEqual(
+            images.read_header(BytesIO(rotated), len(rotated)),
+            ('JPEG', 400, 800)
+        )
@@ -42,7 +42,7 @@ class PrivateIngredientApiTest(TestCase):
         res = self.client.get(INGREDIENT_URL)
         ingredients = Ingredient.objects.all()
         serializer = IngredientSerializer(ingredients, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_ingredient_limited_to_user(self):
@@ -60,8 +60,8 @@ class PrivateIngredientApiTest(TestCase):
             user=self.user,
         )
         serializer = IngredientSerializer(ingredients, many=True)
-        self.assertEqual(res.data, serializer.data)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data['results'], serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_create_ingredients(self):
@@ -104,10 +104,11 @@ class PrivateIngredientApiTest(TestCase):
 
         res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
 
+        ingredient1.refresh_from_db()
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredients_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -130,4 +131,4 @@ class PrivateIngredientApiTest(TestCase):
 
         res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,129 @@
+import base64
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.pagination import RecipeCursorPagination
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def sample_recipe(user, name):
+    """Create & return a sample recipe"""
+    return Recipe.objects.create(
+        user=user, name=name, time_took_min=10, price=5.00
+    )
+
+
+class RecipePaginationTest(TestCase):
+    """Test the keyset pagination of the recipe list"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        for i in range(7):
+            sample_recipe(cls.user, f"recipe {i}")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_first_page_bounded(self):
+        """Test that a request without cursor gets a bounded first page"""
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('next', res.data)
+        self.assertIn('results', res.data)
+        self.assertLessEqual(
+            len(res.data['results']), RecipeCursorPagination.page_size
+        )
+
+    def test_follow_next_cursor(self):
+        """Test that following next cursors walks every recipe once"""
+        ids = []
+        res = self.client.get(RECIPE_URL, {'page_size': 3})
+        while True:
+            self.assertLessEqual(len(res.data['results']), 3)
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        expected = list(
+            Recipe.objects.filter(user=self.user).values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def walk(self, res, link='next'):
+        """Return the ids of every page reached by following link"""
+        ids = []
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.append([recipe['id'] for recipe in res.data['results']])
+            if not res.data[link]:
+                return ids
+            res = self.client.get(res.data[link])
+
+    def test_ties_paged_by_id(self):
+        """Test that runs of equal values are paged by the id tiebreak"""
+        for ordering in ('price', '-price'):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(self.client.get(
+                    RECIPE_URL, {'ordering': ordering, 'page_size': 2}
+                ))
+                ids = [pk for page in pages for pk in page]
+                expected = Recipe.objects.filter(user=self.user).order_by(
+                    ordering, ordering.replace('price', 'id')
+                ).values_list('id', flat=True)
+                self.assertEqual(ids, list(expected))
+                self.assertEqual(len(pages), 4)
+
+    def test_follow_previous_cursor(self):
+        """Test that previous cursors walk the same pages backwards"""
+        params = {'ordering': 'time_took_min', 'page_size': 3}
+        pages = self.walk(self.client.get(RECIPE_URL, params))
+        res = self.client.get(RECIPE_URL, params)
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+        backwards = self.walk(
+            self.client.get(res.data['previous']), link='previous'
+        )
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_page_size_capped(self):
+        """Test that the requested page size is capped by the server"""
+        for i in range(RecipeCursorPagination.max_page_size):
+            sample_recipe(self.user, f"extra {i}")
+        res = self.client.get(RECIPE_URL, {'page_size': 100000})
+        self.assertEqual(
+            len(res.data['results']), RecipeCursorPagination.max_page_size
+        )
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor is rejected"""
+        res = self.client.get(RECIPE_URL, {'cursor': 'not-a-cursor'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        for position in ('[1]', '{}', '["x", 1]', '[[1], 1]'):
+            cursor = base64.b64encode(
+                f'p={position}'.encode()
+            ).decode()
+            res = self.client.get(
+                RECIPE_URL, {'cursor': cursor, 'ordering': 'price'}
+            )
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_ordered_by_name(self):
+        """Test that tag pages follow the name ordering"""
+        for name in ['apple', 'banana', 'cherry', 'date']:
+            Tag.objects.create(user=self.user, name=name)
+        res = self.client.get(TAG_URL, {'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['date', 'cherry', 'banana', 'apple'])
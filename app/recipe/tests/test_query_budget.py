@@ -0,0 +1,180 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.tests.query_budget import QueryBudgetMixin
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+
+def recipe_detail_url(id):
+    """Return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[id])
+
+
+class RecipeQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Test that recipe endpoints run a bounded number of queries"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.count = 0
+
+    def add_recipes(self, amount=10):
+        """Create recipes, each with its own tags and ingredients"""
+        for _ in range(amount):
+            self.count += 1
+            recipe = Recipe.objects.create(
+                user=self.user,
+                name=f"recipe {self.count}",
+                time_took_min=10,
+                price=5.00
+            )
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f"tag {self.count}")
+            )
+            recipe.ingredients.add(Ingredient.objects.create(
+                user=self.user, name=f"ingredient {self.count}"
+            ))
+        return recipe
+
+    def test_list_recipes(self):
+        """Test that listing recipes does not grow with the page size"""
+        self.add_recipes(1)
+        self.assertConstantQueries(
+            lambda: self.client.get(RECIPE_URL),
+            self.add_recipes,
+            budget=4
+        )
+
+    def test_filter_recipes(self):
+        """Test that filtered lists stay within budget"""
+        self.add_recipes(5)
+        tags = ','.join(str(t.id) for t in Tag.objects.all())
+        with self.assertMaxQueries(4):
+            res = self.client.get(RECIPE_URL, {'tags': tags})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_recipe(self):
+        """Test that the recipe detail runs a fixed number of queries"""
+        recipe = self.add_recipes(1)
+
+        def add_relations():
+            for i in range(10):
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name=f"extra {i}")
+                )
+
+        self.assertConstantQueries(
+            lambda: self.client.get(recipe_detail_url(recipe.id)),
+            add_relations,
+            budget=4
+        )
+
+    def test_create_recipe(self):
+        """Test the create recipe budget"""
+        recipe = self.add_recipes(1)
+        data = {
+            'name': 'new recipe',
+            'time_took_min': 5,
+            'price': 3.00,
+            'tags': [recipe.tags.get().id],
+            'ingredients': [recipe.ingredients.get().id],
+        }
+        # Includes finding the owners of the tags and ingredients added
+        with self.assertMaxQueries(18):
+            res = self.client.post(RECIPE_URL, data)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_update_recipe(self):
+        """Test the full and partial update budgets"""
+        recipe = self.add_recipes(1)
+        data = {
+            'name': 'updated',
+            'time_took_min': 5,
+            'price': 3.00,
+            'tags': [recipe.tags.get().id],
+        }
+        with self.assertMaxQueries(13):
+            res = self.client.put(recipe_detail_url(recipe.id), data)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.assertMaxQueries(5):
+            res = self.client.patch(
+                recipe_detail_url(recipe.id), {'name': 'patched'}
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_recipe(self):
+        """Test the delete recipe budget"""
+        recipe = self.add_recipes(1)
+        # Includes the cascade to the recipe's chunked image uploads and
+        # the owners of its tags and ingredients
+        with self.assertMaxQueries(11):
+            res = self.client.delete(recipe_detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_upload_invalid_image(self):
+        """Test the upload image budget"""
+        recipe = self.add_recipes(1)
+        url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+        with self.assertMaxQueries(1):
+            self.client.post(url, {'image': 'notimage'}, format='multipart')
+
+
+class RecipeAttrQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Test that tag and ingredient endpoints run a bounded query count"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def add_attrs(self, model, amount=10):
+        """Create tags or ingredients assigned to a recipe"""
+        recipe = Recipe.objects.create(
+            user=self.user, name="recipe", time_took_min=10, price=5.00
+        )
+        offset = model.objects.count()
+        for i in range(amount):
+            obj = model.objects.create(
+                user=self.user, name=f"{offset + i}"
+            )
+            getattr(recipe, f"{model._meta.model_name}s").add(obj)
+
+    def test_list_tags(self):
+        """Test that listing tags does not grow with the result size"""
+        self.add_attrs(Tag, 1)
+        for params in ({}, {'assigned_only': 1}):
+            self.assertConstantQueries(
+                lambda: self.client.get(TAG_URL, params),
+                lambda: self.add_attrs(Tag),
+                budget=2
+            )
+
+    def test_list_ingredients(self):
+        """Test that listing ingredients does not grow with the result size"""
+        self.add_attrs(Ingredient, 1)
+        for params in ({}, {'assigned_only': 1}):
+            self.assertConstantQueries(
+                lambda: self.client.get(INGREDIENT_URL, params),
+                lambda: self.add_attrs(Ingredient),
+                budget=2
+            )
+
+    def test_create_attrs(self):
+        """Test the tag and ingredient create budgets"""
+        for url in (TAG_URL, INGREDIENT_URL):
+            with self.assertMaxQueries(3):
+                res = self.client.post(url, {'name': f"new {url}"})
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,166 @@
+import os
+import time
+from decimal import Decimal
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RecipeRangeTest(TestCase):
+    """Test range filters and ordering of the recipe list"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        for name, price, time_took in (
+            ("curry", 8, 40), ("salad", 4, 10), ("cake", 12, 90),
+            ("soup", 4, 25), ("toast", 2, 5),
+        ):
+            Recipe.objects.create(
+                user=self.user, name=name, price=price,
+                time_took_min=time_took
+            )
+
+    def names(self, **params):
+        """Return the names of all pages of the list"""
+        names = []
+        res = self.client.get(RECIPE_URL, dict(params, page_size=2))
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            names += [recipe['name'] for recipe in res.data['results']]
+            if not res.data['next']:
+                return names
+            res = self.client.get(res.data['next'])
+
+    def test_range_filters(self):
+        """Test filtering by price and cooking time"""
+        self.assertEqual(
+            self.names(price_min='4', price_max='8.00'),
+            ['curry', 'salad', 'soup']
+        )
+        self.assertEqual(self.names(time_max=25), ['salad', 'soup', 'toast'])
+
+    def test_ordering(self):
+        """Test ordering across pages, ties broken by id"""
+        self.assertEqual(
+            self.names(ordering='price'),
+            ['toast', 'salad', 'soup', 'curry', 'cake']
+        )
+        self.assertEqual(
+            self.names(ordering='-price'),
+            ['cake', 'curry', 'soup', 'salad', 'toast']
+        )
+        self.assertEqual(
+            self.names(ordering='time_took_min', fields='name'),
+            ['toast', 'salad', 'soup', 'curry', 'cake']
+        )
+        self.assertEqual(
+            self.names(ordering='name', time_max=40),
+            ['curry', 'salad', 'soup', 'toast']
+        )
+
+    def test_invalid_params(self):
+        """Test that malformed ranges are rejected"""
+        for params in ({'price_min': 'cheap'}, {'time_max': -1}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_sorted_page_uses_index(self):
+        """Test that a filtered, sorted page can be an index range scan"""
+        queryset = Recipe.objects.filter(
+            user=self.user, price__gte=4
+        ).order_by('price', 'id')[:50]
+        with connection.cursor() as cursor:
+            # Tiny tables would be scanned and sorted otherwise
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            plan = queryset.explain()
+        self.assertIn('recipe_user_price', plan)
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'Set BENCHMARK=1 to run')
+class RecipeRangeBenchmark(TestCase):
+    """Check that a sorted, filtered page stays flat as recipes grow"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="bench@gmail.com",
+            name="bench",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def grow(self, total):
+        """Add recipes until the user has total of them"""
+        start = Recipe.objects.filter(user=self.user).count()
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, name=f"recipe {i}",
+                   price=Decimal(i % 1000) / 10, time_took_min=i % 120)
+            for i in range(start, total)
+        )
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE recipe_recipe')
+
+    def latency(self):
+        """Return the best time of fetching a sorted, filtered page"""
+        params = {
+            'price_min': '20', 'time_max': 100, 'ordering': '-price',
+            'page_size': 50,
+        }
+        best = None
+        with self.settings(RECIPE_RESPONSE_CACHE=None):
+            for _ in range(5):
+                start = time.perf_counter()
+                res = self.client.get(RECIPE_URL, params)
+                elapsed = time.perf_counter() - start
+                self.assertEqual(len(res.data['results']), 50)
+                best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def test_flat_latency(self):
+        """Test that 100x more recipes cost well under 100x the time"""
+        timings = {}
+        for total in (1000, 10000, 100000):
+            self.grow(total)
+            timings[total] = self.latency()
+            print(f"\n{total} recipes: {timings[total] * 1000:.1f} ms")
+        self.assertLess(timings[100000], timings[1000] * 3)
+
+    def test_deep_pages(self):
+        """Test that pages deep into a run of ties cost like the first"""
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, name=f"recipe {i}", price=5,
+                   time_took_min=10)
+            for i in range(20000)
+        )
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE recipe_recipe')
+        ids, timings = [], []
+        url, params = RECIPE_URL, {'ordering': '-price', 'page_size': 200}
+        with self.settings(RECIPE_RESPONSE_CACHE=None):
+            while url:
+                start = time.perf_counter()
+                res = self.client.get(url, params)
+                timings.append(time.perf_counter() - start)
+                ids.extend(recipe['id'] for recipe in res.data['results'])
+                url, params = res.data['next'], None
+        print(f"\npage 1: {timings[0] * 1000:.1f} ms, "
+              f"page {len(timings)}: {timings[-1] * 1000:.1f} ms")
+        self.assertEqual(len(ids), 20000)
+        self.assertEqual(len(set(ids)), 20000)
+        self.assertLess(min(timings[-5:]), min(timings[:5]) * 3)
@@ -86,7 +86,7 @@ class PrivateRecipeApiTest(TestCase):
         res = self.client.get(RECIPE_URL)
         recipes = Recipe.objects.all()
         serializer = RecipeSerializer(recipes, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_limited_user(self):
@@ -102,8 +102,8 @@ class PrivateRecipeApiTest(TestCase):
         )
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data['results'], serializer.data)
+        self.assertEqual(len(res.data['results']), 2)
 
     def test_recipe_detail(self):
         """Test to get a recipe detail"""
@@ -248,9 +248,9 @@ class RecipeImageUploadTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipe_ingredients(self):
         """Test returning recipes with particular ingredient"""
@@ -272,6 +272,6 @@ class RecipeImageUploadTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
@@ -0,0 +1,144 @@
+import os
+import time
+from decimal import Decimal
+from unittest import skipUnless
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient
+from recipe.representation import recipe_values, represent_recipes
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+FIELDS = set(RecipeSerializer.Meta.fields)
+
+
+def recipe_detail_url(id):
+    """Return a recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[id])
+
+
+def render(data):
+    """Return data rendered as the API renders JSON"""
+    return JSONRenderer().render(data)
+
+
+class RepresentationParityTest(TestCase):
+    """Test that the fast path renders exactly like the serializers"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("vegan", "quick", "Spicy")
+        ]
+        ingredient = Ingredient.objects.create(user=self.user, name="rice")
+        prices = [Decimal('5'), Decimal('12.5'), Decimal('0.99')]
+        for i, price in enumerate(prices):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                name=f"recipe {i}",
+                time_took_min=i * 7,
+                price=price,
+                url="https://example.com" if i else ""
+            )
+            recipe.tags.add(*tags[:i + 1])
+        recipe.ingredients.add(ingredient)
+
+    def recipes(self):
+        """Return the user's recipes as the serializers load them"""
+        return Recipe.objects.filter(user=self.user).prefetch_related(
+            'tags', 'ingredients'
+        )
+
+    def test_list_parity(self):
+        """Test the list output against RecipeSerializer"""
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        expected = RecipeSerializer(self.recipes(), many=True).data
+        self.assertEqual(render(res.data['results']), render(expected))
+
+    def test_detail_parity(self):
+        """Test the detail output against RecipeDetailSerializer"""
+        for recipe in self.recipes():
+            res = self.client.get(recipe_detail_url(recipe.id))
+            self.assertEqual(
+                res.content, render(RecipeDetailSerializer(recipe).data)
+            )
+
+    def test_sparse_fields_parity(self):
+        """Test that selected fields keep the serializer key order"""
+        res = self.client.get(RECIPE_URL, {'fields': 'price,tags,name'})
+        expected = [
+            {'name': item['name'], 'tags': item['tags'],
+             'price': item['price']}
+            for item in RecipeSerializer(self.recipes(), many=True).data
+        ]
+        self.assertEqual(render(res.data['results']), render(expected))
+
+    def test_missing_detail(self):
+        """Test that unknown or malformed ids are not found"""
+        for pk in (999999, 'abc'):
+            res = self.client.get(recipe_detail_url(pk))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'Set BENCHMARK=1 to run')
+class RepresentationBenchmark(TestCase):
+    """Compare the fast path with the serializers at 10k recipes"""
+    size = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(
+            email="bench@gmail.com",
+            name="bench",
+            password="testpassword"
+        )
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f"tag {i}") for i in range(20)
+        )
+        tags = Tag.objects.filter(user=user)
+        Recipe.objects.bulk_create(
+            Recipe(user=user, name=f"recipe {i}", time_took_min=i % 90,
+                   price=Decimal(i % 100) / 4)
+            for i in range(cls.size)
+        )
+        through = Recipe.tags.through
+        through.objects.bulk_create(
+            through(recipe_id=recipe_id, tag_id=tags[i % 20].id)
+            for i, recipe_id in enumerate(
+                Recipe.objects.values_list('id', flat=True)
+            )
+        )
+        cls.queryset = Recipe.objects.filter(user=user)
+
+    def test_speedup(self):
+        """Test that the fast path beats the serializers"""
+        start = time.perf_counter()
+        expected = RecipeSerializer(
+            self.queryset.prefetch_related('tags', 'ingredients'), many=True
+        ).data
+        serializer_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data = represent_recipes(
+            list(recipe_values(self.queryset, FIELDS)), FIELDS
+        )
+        fast_time = time.perf_counter() - start
+
+        print(
+            f"\n{self.size} recipes: serializer {serializer_time:.3f}s, "
+            f"fast path {fast_time:.3f}s, "
+            f"{serializer_time / fast_time:.1f}x faster"
+        )
+        self.assertEqual(render(data), render(expected))
+        self.assertLess(fast_time, serializer_time)
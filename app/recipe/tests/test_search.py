@@ -0,0 +1,110 @@
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, name):
+    """Create & return a sample recipe"""
+    return Recipe.objects.create(
+        user=user, name=name, time_took_min=10, price=5.00
+    )
+
+
+class RecipeSearchTest(TestCase):
+    """Test searching recipes by name, tag and ingredient"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.curry = sample_recipe(self.user, "Paneer curry")
+        self.cake = sample_recipe(self.user, "Chocolate cake")
+        self.salad = sample_recipe(self.user, "Green salad")
+        self.cake.tags.add(Tag.objects.create(user=self.user, name="dessert"))
+        self.salad.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="cucumber")
+        )
+
+    def search(self, term):
+        """Return the recipe ids found for `term`"""
+        res = self.client.get(RECIPE_URL, {'search': term})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_by_name(self):
+        """Test finding a recipe by its name"""
+        self.assertEqual(self.search("curry"), [self.curry.id])
+
+    def test_search_by_tag_and_ingredient(self):
+        """Test finding recipes by tag and ingredient names"""
+        self.assertEqual(self.search("dessert"), [self.cake.id])
+        self.assertEqual(self.search("cucumber"), [self.salad.id])
+
+    def test_search_limited_to_user(self):
+        """Test that other users' recipes are not found"""
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        sample_recipe(user2, "Mutton curry")
+        self.assertEqual(self.search("curry"), [self.curry.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_vector_maintained(self):
+        """Test that relation changes and renames update the vector"""
+        tag = Tag.objects.create(user=self.user, name="spicy")
+        self.curry.tags.add(tag)
+        self.assertEqual(self.search("spicy"), [self.curry.id])
+
+        tag.name = "fiery"
+        tag.save()
+        self.assertEqual(self.search("fiery"), [self.curry.id])
+
+        self.curry.tags.remove(tag)
+        self.assertEqual(self.search("fiery"), [])
+
+        self.curry.name = "Paneer tikka"
+        self.curry.save()
+        self.assertEqual(self.search("tikka"), [self.curry.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_ranked(self):
+        """Test that name matches rank above tag matches"""
+        chocolate = Tag.objects.create(user=self.user, name="chocolate")
+        self.salad.tags.add(chocolate)
+        self.assertEqual(self.search("chocolate"), [self.cake.id,
+                                                    self.salad.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    @override_settings(RECIPE_SEARCH_TRIGRAM=True)
+    def test_fallback_ignores_other_users(self):
+        """Test that other users' full-text matches keep the fallback"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            if cursor.fetchone() is None:
+                self.skipTest('Needs the pg_trgm extension')
+        user2 = get_user_model().objects.create_user(
+            email="test2@gmail.com",
+            name="test2",
+            password="testpassword"
+        )
+        sample_recipe(user2, "Choclate mousse")
+        self.assertEqual(self.search("choclate"), [self.cake.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_stemmed(self):
+        """Test that word forms are matched"""
+        self.assertEqual(self.search("cakes"), [self.cake.id])
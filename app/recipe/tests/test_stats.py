@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from recipe.models import Recipe, Tag, Ingredient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe.tests.query_budget import QueryBudgetMixin
+
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+class RecipeStatsTest(QueryBudgetMixin, TestCase):
+    """Test the recipe stats endpoint"""
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.veg = Tag.objects.create(user=self.user, name="veg")
+        self.hot = Tag.objects.create(user=self.user, name="hot")
+        for i in range(11):
+            recipe = Recipe.objects.create(
+                user=self.user, name=f"recipe {i}",
+                time_took_min=i * 10, price=i + 0.5
+            )
+            recipe.tags.add(self.veg)
+            if i % 2:
+                recipe.tags.add(self.hot)
+
+    def stats(self, **params):
+        """Return the stats for the params"""
+        res = self.client.get(STATS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_stats(self):
+        """Test totals, percentiles, histograms and top tags"""
+        data = self.stats()
+        self.assertEqual(data['count'], 11)
+        self.assertEqual(data['time_took_min']['min'], 0)
+        self.assertEqual(data['time_took_min']['max'], 100)
+        self.assertEqual(data['time_took_min']['avg'], 50)
+        self.assertEqual(
+            data['time_took_min']['percentiles'],
+            {'p50': 50, 'p90': 90, 'p99': 99}
+        )
+        self.assertEqual(data['price']['percentiles']['p50'], 5.5)
+        histogram = data['time_took_min']['histogram']
+        self.assertEqual(len(histogram), 10)
+        self.assertEqual(histogram[0], {'start': 0, 'end': 10, 'count': 1})
+        self.assertEqual(histogram[-1]['count'], 2)
+        self.assertEqual(sum(bucket['count'] for bucket in histogram), 11)
+        self.assertEqual(data['top_tags'], [
+            {'id': self.veg.id, 'name': 'veg', 'count': 11, 'rank': 1},
+            {'id': self.hot.id, 'name': 'hot', 'count': 5, 'rank': 2},
+        ])
+        self.assertEqual(data['top_ingredients'], [])
+
+    def test_empty(self):
+        """Test the stats of a user without recipes"""
+        Recipe.objects.all().delete()
+        data = self.stats()
+        self.assertEqual(data['count'], 0)
+        self.assertIsNone(data['price']['percentiles']['p50'])
+        self.assertEqual(data['price']['histogram'], [])
+
+    def test_incremental_refresh(self):
+        """Test that only the sections a change affects are recomputed"""
+        self.stats()
+        with self.assertMaxQueries(0):
+            self.stats()
+        recipe = Recipe.objects.first()
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="rice")
+        )
+        with self.assertMaxQueries(1):
+            data = self.stats()
+        self.assertEqual(data['top_ingredients'][0]['name'], 'rice')
+
+        recipe.price = 100
+        recipe.save()
+        self.assertEqual(self.stats()['price']['max'], 100)
+
+    def test_filtered(self):
+        """Test that filtered stats bypass the cache"""
+        self.stats()
+        data = self.stats(tags=self.hot.id)
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(self.stats()['count'], 11)
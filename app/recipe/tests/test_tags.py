@@ -48,7 +48,7 @@ class PrivateTagApiTest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are specific to user"""
@@ -62,8 +62,8 @@ class PrivateTagApiTest(TestCase):
 
         res = self.client.get(self.TAG_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successfully(self):
         """Test that a tag is created successfully"""
@@ -100,10 +100,11 @@ class PrivateTagApiTest(TestCase):
         recipe1.tags.add(tag1)
         res = self.client.get(self.TAG_URL, {'assigned_only': 1})
 
+        tag1.refresh_from_db()
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_get_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -125,4 +126,4 @@ class PrivateTagApiTest(TestCase):
         recipe2.tags.add(tag)
         res = self.client.get(self.TAG_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,253 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from recipe import uploads
+from recipe.models import ImageBlob, ImageUpload, Recipe
+from recipe.tests.test_images import jpeg
+
+
+def start_url(recipe_id):
+    """Return url to start a chunked upload"""
+    return reverse('recipe:recipe-start-upload', args=[recipe_id])
+
+
+def chunk_url(recipe_id, upload_id):
+    """Return url of a chunked upload"""
+    return reverse('recipe:recipe-upload-chunk', args=[recipe_id, upload_id])
+
+
+def finish_url(recipe_id, upload_id):
+    """Return url to finish a chunked upload"""
+    return reverse(
+        'recipe:recipe-finish-upload', args=[recipe_id, upload_id]
+    )
+
+
+class ChunkedUploadTest(TestCase):
+    """Test uploading recipe images in chunks"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name, RECIPE_IMAGE_WORKERS=0,
+            RECIPE_UPLOAD_MAX_CHUNK=1024
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            name="test",
+            password="testpassword"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, name="Dal", time_took_min=20, price=3
+        )
+        self.image = jpeg()
+
+    def start(self, size=None):
+        """Start an upload of the test image, returning its id"""
+        res = self.client.post(
+            start_url(self.recipe.id), {'size': size or len(self.image)}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['offset'], 0)
+        return res.data['id']
+
+    def put(self, upload_id, offset, data):
+        """Send a chunk at offset"""
+        return self.client.generic(
+            'PUT', chunk_url(self.recipe.id, upload_id), data,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def send(self, upload_id, start=0):
+        """Send the test image from start in chunks of the largest size"""
+        for offset in range(start, len(self.image), 1024):
+            res = self.put(upload_id, offset, self.image[offset:offset + 1024])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_upload(self):
+        """Test that chunks are assembled into the recipe image"""
+        upload_id = self.start()
+        res = self.send(upload_id)
+        self.assertEqual(res.data['offset'], len(self.image))
+
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open('rb') as file:
+            self.assertEqual(file.read(), self.image)
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+        self.assertNotEqual(self.recipe.image_variants, '')
+        self.assertEqual(res.data['images']['original'],
+                         f'/media/{self.recipe.image.name}')
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.dirname(
+            uploads.partial_path(ImageUpload(id=upload_id))
+        )), [])
+
+    def test_resume(self):
+        """Test that an interrupted upload resumes at its offset"""
+        upload_id = self.start()
+        self.put(upload_id, 0, self.image[:1024])
+        res = self.put(upload_id, 0, self.image[:1024])
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data['offset'], 1024)
+        self.send(upload_id, start=res.data['offset'])
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_limits(self):
+        """Test that oversized uploads and chunks are refused"""
+        with self.settings(RECIPE_UPLOAD_MAX_SIZE=10):
+            res = self.client.post(start_url(self.recipe.id), {'size': 11})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        upload_id = self.start()
+        res = self.put(upload_id, 0, self.image[:1025])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        upload_id = self.start(size=10)
+        res = self.put(upload_id, 0, self.image[:11])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_incomplete_or_invalid(self):
+        """Test that only complete, valid images are attached"""
+        upload_id = self.start()
+        self.put(upload_id, 0, self.image[:1024])
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        upload_id = self.start(size=10)
+        self.put(upload_id, 0, b'not image!')
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+
+    def test_content_length(self):
+        """Test that chunks need a valid Content-Length"""
+        upload_id = self.start()
+        url = chunk_url(self.recipe.id, upload_id)
+        for length, code in (('', status.HTTP_411_LENGTH_REQUIRED),
+                             ('abc', status.HTTP_400_BAD_REQUEST),
+                             ('-1', status.HTTP_400_BAD_REQUEST)):
+            res = self.client.generic(
+                'PUT', url, self.image[:1024],
+                content_type='application/offset+octet-stream',
+                HTTP_UPLOAD_OFFSET='0', CONTENT_LENGTH=length
+            )
+            self.assertEqual(res.status_code, code, length)
+        res = self.client.get(url)
+        self.assertEqual(res.data['offset'], 0)
+
+    def test_chunk_read_unlocked(self):
+        """Test that the body is read before the upload row is locked"""
+        upload = ImageUpload.objects.get(pk=self.start())
+        depth = len(connection.savepoint_ids)
+        depths = []
+
+        class Stream(BytesIO):
+            def read(stream, size=-1):
+                depths.append(len(connection.savepoint_ids))
+                return super().read(size)
+        uploads.append_chunk(upload, 0, Stream(self.image[:1024]), 1024)
+        self.assertEqual(set(depths), {depth})
+
+    def test_chunk_sent_twice(self):
+        """Test that a duplicate finishing first makes the other conflict"""
+        upload = ImageUpload.objects.get(pk=self.start())
+        uploads.append_chunk(upload, 0, BytesIO(self.image[:1024]), 1024)
+        upload.refresh_from_db()
+        chunk = self.image[1024:2048]
+
+        class Stream(BytesIO):
+            # The duplicate is appended while this one is being read
+            def read(stream, size=-1):
+                if not stream.tell():
+                    uploads.append_chunk(
+                        ImageUpload.objects.get(pk=upload.pk), 1024,
+                        BytesIO(chunk), 1024
+                    )
+                return super().read(size)
+        with self.assertRaises(uploads.OffsetMismatch) as error:
+            uploads.append_chunk(upload, 1024, Stream(chunk), 1024)
+        self.assertEqual(error.exception.offset, 2048)
+        with open(uploads.partial_path(upload), 'rb') as file:
+            self.assertEqual(file.read(), self.image[:2048])
+        self.assertEqual(os.listdir(os.path.dirname(
+            uploads.partial_path(upload)
+        )), [f'{upload.id}.part'])
+
+    def test_finish_twice(self):
+        """Test that a repeated finish doesn't attach the image again"""
+        upload_id = self.start()
+        self.send(upload_id)
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(ImageBlob.objects.get().refs, 1)
+
+    def test_other_users_recipe(self):
+        """Test that uploads are limited to the user's recipes"""
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            name="other",
+            password="testpassword"
+        )
+        recipe = Recipe.objects.create(
+            user=other, name="Dal", time_took_min=20, price=3
+        )
+        res = self.client.post(start_url(recipe.id), {'size': 10})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_expired(self):
+        """Test that abandoned uploads expire and are cleaned up"""
+        upload_id = self.start()
+        self.put(upload_id, 0, self.image[:1024])
+        ImageUpload.objects.update(
+            modified=timezone.now() - timedelta(days=2)
+        )
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        out = StringIO()
+        call_command('clean_uploads', stdout=out)
+        self.assertIn('1 uploads deleted', out.getvalue())
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(
+            uploads.partial_path(ImageUpload(id=upload_id))
+        ))
+
+    def test_orphaned_files(self):
+        """Test that partial files of deleted recipes are cleaned up"""
+        upload = ImageUpload(id=self.start())
+        self.recipe.delete()
+        path = uploads.partial_path(upload)
+        old = (timezone.now() - timedelta(days=2)).timestamp()
+        os.utime(path, (old, old))
+        call_command('clean_uploads', stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+
+    def test_abandon(self):
+        """Test that a client can drop its upload"""
+        upload_id = self.start()
+        res = self.client.delete(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ImageUpload.objects.exists())
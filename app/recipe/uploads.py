@@ -0,0 +1,222 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import exceptions, status
+from .images import inspect_image
+from .models import ImageUpload
+from .storage import format_extension
+
+PARTIAL_DIR = 'uploads/partial'
+# Bytes read from the request and written to disk at a time
+BUFFER_SIZE = 64 * 1024
+
+
+class OffsetMismatch(exceptions.APIException):
+    """Raised when a chunk doesn't start where the upload stands"""
+    status_code = status.HTTP_409_CONFLICT
+    default_code = 'offset_mismatch'
+
+    def __init__(self, offset):
+        super().__init__(f'The upload continues at offset {offset}.')
+        self.offset = offset
+
+
+class LengthRequired(exceptions.APIException):
+    """Raised when a chunk comes without its length"""
+    status_code = status.HTTP_411_LENGTH_REQUIRED
+    default_detail = 'Send the Content-Length header.'
+    default_code = 'length_required'
+
+
+def chunk_length(meta):
+    """Return the length of a chunk from the request's CONTENT_LENGTH"""
+    value = meta.get('CONTENT_LENGTH')
+    if not value:
+        # Chunked transfer encoding, or nothing sent at all
+        raise LengthRequired()
+    try:
+        length = int(value)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise exceptions.ValidationError('Invalid Content-Length header.')
+    return length
+
+
+def partial_path(upload):
+    """Return the file holding the bytes received for upload"""
+    return default_storage.path(f'{PARTIAL_DIR}/{upload.id}.part')
+
+
+def expired_before():
+    """Return the time before which an untouched upload has expired"""
+    return timezone.now() - timedelta(
+        seconds=settings.RECIPE_UPLOAD_EXPIRY
+    )
+
+
+def active_uploads(recipe):
+    """Return the recipe's uploads that have not expired"""
+    return recipe.image_uploads.filter(modified__gte=expired_before())
+
+
+def start_upload(recipe, size):
+    """Create an upload of size bytes for the recipe"""
+    if size > settings.RECIPE_UPLOAD_MAX_SIZE:
+        raise exceptions.ValidationError({
+            'size': f'At most {settings.RECIPE_UPLOAD_MAX_SIZE} bytes.'
+        })
+    upload = ImageUpload.objects.create(recipe=recipe, size=size)
+    os.makedirs(os.path.dirname(partial_path(upload)), exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def _receive(upload, stream, length):
+    """Write length bytes of stream to a file of its own, returning it
+
+    Each attempt gets its own file next to the partial one, so a slow
+    client holds no lock. Only BUFFER_SIZE bytes are in memory.
+    """
+    fd, path = tempfile.mkstemp(
+        prefix=f'{upload.id}.', suffix='.chunk',
+        dir=os.path.dirname(partial_path(upload))
+    )
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            while written < length:
+                data = stream.read(min(BUFFER_SIZE, length - written))
+                if not data:
+                    break
+                file.write(data)
+                written += len(data)
+    except BaseException:
+        os.remove(path)
+        raise
+    if written < length:
+        os.remove(path)
+        raise exceptions.ValidationError('The chunk was cut short.')
+    return path
+
+
+def append_chunk(upload, offset, stream, length):
+    """Write length bytes of stream at offset, returning the upload
+
+    The chunk is received outside any transaction, then the upload row
+    is locked only to check the offset and append it, so chunks sent
+    twice can't interleave and the loser gets OffsetMismatch.
+    """
+    if length > settings.RECIPE_UPLOAD_MAX_CHUNK:
+        raise exceptions.ValidationError(
+            f'Chunks have at most {settings.RECIPE_UPLOAD_MAX_CHUNK} bytes.'
+        )
+    # Checked again under the lock, this only spares reading the body
+    if offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    if offset + length > upload.size:
+        raise exceptions.ValidationError('The chunk exceeds the size.')
+    chunk = _receive(upload, stream, length)
+    try:
+        with transaction.atomic():
+            try:
+                upload = ImageUpload.objects.select_for_update().get(
+                    pk=upload.pk
+                )
+            except ImageUpload.DoesNotExist:
+                raise exceptions.NotFound()
+            if offset != upload.offset:
+                raise OffsetMismatch(upload.offset)
+            if offset == 0:
+                os.replace(chunk, partial_path(upload))
+            else:
+                with open(partial_path(upload), 'r+b') as file, \
+                        open(chunk, 'rb') as data:
+                    # Drop what a failed earlier append left past the offset
+                    file.truncate(offset)
+                    file.seek(offset)
+                    shutil.copyfileobj(data, file, BUFFER_SIZE)
+            upload.offset += length
+            upload.save(update_fields=['offset', 'modified'])
+    finally:
+        if os.path.exists(chunk):
+            os.remove(chunk)
+    return upload
+
+
+def finish_upload(upload):
+    """Attach a completely received image to its recipe
+
+    The file must pass inspect_image(); a rejected upload is removed.
+    The upload row stays locked meanwhile, so a finish sent twice
+    attaches the image once and the repeat finds no upload.
+    """
+    with transaction.atomic():
+        try:
+            upload = ImageUpload.objects.select_for_update().select_related(
+                'recipe'
+            ).get(pk=upload.pk)
+        except ImageUpload.DoesNotExist:
+            raise exceptions.NotFound()
+        if upload.offset != upload.size:
+            raise exceptions.ValidationError(
+                f'Received {upload.offset} of {upload.size} bytes.'
+            )
+        recipe = upload.recipe
+        with open(partial_path(upload), 'rb') as file:
+            try:
+                image_format = inspect_image(file, upload.size)[0]
+            except exceptions.ValidationError as error:
+                rejected = exceptions.ValidationError({'image': error.detail})
+            else:
+                rejected = None
+                recipe.image.save(
+                    f'image{format_extension(image_format)}', File(file),
+                    save=False
+                )
+                recipe.image_variants = ''
+                recipe.save(update_fields=['image', 'image_variants'])
+        discard(upload)
+    if rejected is not None:
+        raise rejected
+    return recipe
+
+
+def discard(upload):
+    """Delete an upload and the bytes received for it"""
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def discard_expired():
+    """Delete the expired uploads, returning their number
+
+    Partial files left by uploads deleted with their recipe go too.
+    """
+    expired = ImageUpload.objects.filter(modified__lt=expired_before())
+    count = 0
+    for upload in expired.iterator():
+        discard(upload)
+        count += 1
+    directory = default_storage.path(PARTIAL_DIR)
+    if os.path.isdir(directory):
+        active = {
+            f'{pk}.part' for pk in ImageUpload.objects.values_list(
+                'id', flat=True
+            )
+        }
+        cutoff = expired_before().timestamp()
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name not in active and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+    return count
@@ -1,23 +1,54 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from django.utils.decorators import method_decorator
+from rest_framework import viewsets, mixins, status, serializers
 from rest_framework.permissions import IsAuthenticated
+from core.views import serve_media
+from user.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication
+)
 from .serializers import (
     TagSerializer, IngredientSerializer,
     RecipeSerializer, RecipeDetailSerializer,
-    RecipeImageSerializer
+    RecipeImageSerializer, RecipeBulkItemSerializer, RecipeRangeSerializer,
+    ImageUploadSerializer, selected_fields
 )
 from .models import Tag, Ingredient, Recipe
+from .autocomplete import complete
+from .cache import cached_response
+from .conditional import conditional
+from .bulk import save_recipes, upsert_names
+from .export import export_recipes, stream_json_array, stream_ndjson
+from .filters import filter_recipes
+from .search import search_recipes
+from .stats import recipe_stats
+from .blobs import IMMUTABLE
+from .images import schedule_variants
+from .storage import BLOB_DIR
+from . import uploads
+from .representation import recipe_values, represent_recipes
+from .pagination import RecipeCursorPagination, RecipeAttrCursorPagination
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
 
+@method_decorator(conditional, name='list')
 class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attribute"""
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication, SignedTokenAuthentication
+    ]
+    pagination_class = RecipeAttrCursorPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['name', 'recipe_count']
+    ordering = ['-name']
 
     def get_queryset(self):
         """return user related objects"""
@@ -26,13 +57,47 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(user=self.request.user).distinct()
+            queryset = queryset.filter(recipe_count__gt=0)
+        return queryset.filter(user=self.request.user)
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        """List the user's objects, served from the response cache"""
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         """Create a new object"""
         serializer.save(user=self.request.user)
 
+    @action(methods=['POST'], detail=False)
+    def bulk(self, request):
+        """Resolve or create a list of names, returning them in order"""
+        names = serializers.ListField(
+            child=serializers.CharField(max_length=255),
+            max_length=settings.RECIPE_BULK_MAX_ITEMS
+        ).run_validation(request.data)
+        ids = upsert_names(self.queryset.model, request.user, names)
+        return Response(
+            [{'id': pk, 'name': name} for pk, name in zip(ids, names)],
+            status=status.HTTP_200_OK
+        )
+
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Return the names starting with ?q=, served from memory"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+        limit = max(1, min(limit, settings.RECIPE_AUTOCOMPLETE_MAX_LIMIT))
+        matches = complete(
+            self.queryset.model,
+            request.user.id,
+            request.query_params.get('q', ''),
+            limit
+        )
+        return Response(matches)
+
 
 class TagListViewSet(BaseRecipeAttrViewSet):
     """Class for the showing tag list"""
@@ -46,25 +111,90 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
 
 
+@method_decorator(conditional, name='list')
+@method_decorator(conditional, name='retrieve')
 class RecipeViewSet(viewsets.ModelViewSet):
     """Class to manipulate the recipe objects"""
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication, SignedTokenAuthentication
+    ]
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
+    pagination_class = RecipeCursorPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['id', 'name', 'price', 'time_took_min']
+    ordering = ['id']
+    filter_params = (
+        'tags', 'ingredients', 'search', 'price_min', 'price_max', 'time_max'
+    )
+
+    def _params_to_ints(self, name):
+        """Convert a comma separated query param to a list of ids"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return []
+        try:
+            return [int(i) for i in value.split(',')]
+        except ValueError:
+            raise ValidationError({name: 'Expected comma separated ids.'})
 
     def get_queryset(self):
         """return user related objects"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tags_id = [int(i) for i in tags.split(',')]
-            queryset = queryset.filter(tags__id__in=tags_id)
-        if ingredients:
-            ingredients_id = [int(i) for i in ingredients.split(',')]
-            queryset = queryset.filter(ingredients__id__in=ingredients_id)
-        return queryset.filter(user=self.request.user)
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': 'Expected "any" or "all".'})
+        queryset = filter_recipes(
+            self.queryset,
+            self.request.user,
+            tag_ids=self._params_to_ints('tags'),
+            ingredient_ids=self._params_to_ints('ingredients'),
+            match_all=match == 'all'
+        )
+        ranges = RecipeRangeSerializer(data=self.request.query_params)
+        ranges.is_valid(raise_exception=True)
+        lookups = {
+            'price_min': 'price__gte',
+            'price_max': 'price__lte',
+            'time_max': 'time_took_min__lte',
+        }
+        queryset = queryset.filter(**{
+            lookups[name]: value
+            for name, value in ranges.validated_data.items()
+        })
+        # Before the search, whose fallback depends on what matched
+        queryset = queryset.filter(user=self.request.user)
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, search)
+        return queryset
+
+    def _selected_fields(self):
+        """Return the recipe fields requested with ?fields= and ?omit="""
+        return selected_fields(
+            self.request, self.get_serializer_class().Meta.fields
+        )
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        """List recipes from value rows instead of model serializers"""
+        fields = self._selected_fields()
+        queryset = recipe_values(
+            self.filter_queryset(self.get_queryset()), fields,
+            extra=self.ordering_fields
+        )
+        rows = self.paginate_queryset(queryset)
+        return self.get_paginated_response(represent_recipes(rows, fields))
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        """Return a recipe from a value row instead of a model serializer"""
+        fields = self._selected_fields()
+        queryset = recipe_values(
+            self.filter_queryset(self.get_queryset()), fields
+        )
+        row = get_object_or_404(queryset, pk=self.kwargs['pk'])
+        return Response(represent_recipes([row], fields, detail=True)[0])
 
     def perform_create(self, serializer):
         """Create a new recipe"""
@@ -74,10 +204,70 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """return appropriate serializer class"""
         if self.action == 'retrieve':
             return RecipeDetailSerializer
-        elif self.action == "upload_image":
+        elif self.action in ("upload_image", "finish_upload"):
             return RecipeImageSerializer
+        elif self.action in ("start_upload", "upload_chunk"):
+            return ImageUploadSerializer
+        elif self.action == 'bulk':
+            return RecipeBulkItemSerializer
         return self.serializer_class
 
+    @action(methods=['POST'], detail=False)
+    def bulk(self, request):
+        """Create or update a list of recipes in one transaction"""
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of recipes.')
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            raise ValidationError(
+                f'At most {settings.RECIPE_BULK_MAX_ITEMS} recipes allowed.'
+            )
+        saved, errors = save_recipes(request.user, items)
+        recipes = Recipe.objects.prefetch_related(
+            'tags', 'ingredients'
+        ).in_bulk(saved.values())
+        results = []
+        for i in range(len(items)):
+            if i in errors:
+                results.append({'errors': errors[i]})
+            else:
+                results.append(RecipeSerializer(recipes[saved[i]]).data)
+        return Response(results, status=status.HTTP_200_OK)
+
+    @action(methods=['GET'], detail=False)
+    def stats(self, request):
+        """Return counts, distributions and top tags and ingredients"""
+        filtered = any(
+            name in request.query_params for name in self.filter_params
+        )
+        return Response(recipe_stats(
+            self.get_queryset(), request.user.id, cached=not filtered
+        ))
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream the recipes as a JSON array, or NDJSON with ?output="""
+        output = request.query_params.get('output', 'json')
+        if output not in ('json', 'ndjson'):
+            raise ValidationError({'output': 'Expected "json" or "ndjson".'})
+        items = export_recipes(
+            self.get_queryset(),
+            self._selected_fields(),
+            settings.RECIPE_EXPORT_CHUNK_SIZE
+        )
+        if output == 'ndjson':
+            response = StreamingHttpResponse(
+                stream_ndjson(items), content_type='application/x-ndjson'
+            )
+        else:
+            response = StreamingHttpResponse(
+                stream_json_array(items), content_type='application/json'
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{output}"'
+        )
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to recipe"""
@@ -87,9 +277,68 @@ class RecipeViewSet(viewsets.ModelViewSet):
             data=request.data
         )
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save()
+            if recipe.image:
+                schedule_variants(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=['POST'], detail=True, url_path='uploads')
+    def start_upload(self, request, pk=None):
+        """Start a chunked upload of an image of the given size"""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = uploads.start_upload(
+            recipe, serializer.validated_data['size']
+        )
+        return Response(
+            self.get_serializer(upload).data, status=status.HTTP_201_CREATED
+        )
+
+    def get_upload(self, upload_id):
+        """Return the unexpired upload of the recipe in the URL"""
+        return get_object_or_404(
+            uploads.active_uploads(self.get_object()), pk=upload_id
+        )
+
+    @action(methods=['GET', 'PUT', 'DELETE'], detail=True,
+            url_path=r'uploads/(?P<upload_id>[0-9a-f-]+)')
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        """Report, extend or abandon a chunked upload
+
+        A PUT appends its raw body at the offset in the Upload-Offset
+        header, which must be where the upload stands, as GET reports.
+        """
+        upload = self.get_upload(upload_id)
+        if request.method == 'DELETE':
+            uploads.discard(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'PUT':
+            try:
+                offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+            except (KeyError, ValueError):
+                raise ValidationError('Send the Upload-Offset header.')
+            length = uploads.chunk_length(request.META)
+            upload = uploads.append_chunk(
+                upload, offset, request.stream, length
+            )
+        return Response(self.get_serializer(upload).data)
+
+    @action(methods=['POST'], detail=True,
+            url_path=r'uploads/(?P<upload_id>[0-9a-f-]+)/finish')
+    def finish_upload(self, request, pk=None, upload_id=None):
+        """Attach a completely uploaded image to the recipe"""
+        recipe = uploads.finish_upload(self.get_upload(upload_id))
+        schedule_variants(recipe)
+        return Response(self.get_serializer(recipe).data)
+
+
+def image_blob(request, path):
+    """Serve an image blob, cacheable for good as its name is its hash"""
+    return serve_media(
+        request, f'{BLOB_DIR}/{path}', cache_control=IMMUTABLE
+    )
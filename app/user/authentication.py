@@ -0,0 +1,188 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.signing import BadSignature, SignatureExpired
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication, TokenAuthentication, get_authorization_header
+)
+from rest_framework.authtoken.models import Token
+from core import metrics
+from . import tokens
+from .models import TokenUser
+
+
+class TokenUserCache:
+    """Per-process LRU of token keys to users, with a time to live
+
+    With a shared cache alias, token keys are also mapped to user ids
+    there, so a miss in a fresh process costs a primary key lookup of the
+    user instead of the token join. Invalidations reach the shared cache
+    and this process; other processes drop their entries within the
+    time to live.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached user of a token key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Views may change request.user, don't share the cached instance
+        return copy.copy(user)
+
+    def set(self, key, user):
+        """Cache the user of a token key"""
+        with self._lock:
+            self._entries[key] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys=(), user_id=None):
+        """Drop the given token keys and every key of user_id"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            if user_id is not None:
+                for key, (user, expires) in list(self._entries.items()):
+                    if user.pk == user_id:
+                        del self._entries[key]
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+token_users = TokenUserCache(
+    settings.TOKEN_AUTH_CACHE_MAX_SIZE, settings.TOKEN_AUTH_CACHE_TTL
+)
+
+
+def _shared_key(key):
+    """Return the shared cache key of a token key"""
+    return f'auth-token:{key}'
+
+
+def _shared_cache():
+    """Return the shared token cache, or None when not configured"""
+    alias = settings.TOKEN_AUTH_SHARED_CACHE
+    return None if alias is None else caches[alias]
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the token query for known tokens
+
+    A drop-in for TokenAuthentication on hot views: set it in their
+    authentication_classes.
+    """
+
+    def authenticate_credentials(self, key):
+        """Return (user, token) of the key, from the caches when possible"""
+        user = token_users.get(key)
+        if user is not None:
+            metrics.increment('token_cache.hit')
+            return user, self._token(key, user)
+        metrics.increment('token_cache.miss')
+
+        shared = _shared_cache()
+        user_id = None if shared is None else shared.get(_shared_key(key))
+        if user_id is not None:
+            user = get_user_model().objects.filter(pk=user_id).first()
+            if user is None:
+                shared.delete(_shared_key(key))
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            if shared is not None:
+                shared.set(
+                    _shared_key(key), user.pk,
+                    settings.TOKEN_AUTH_SHARED_CACHE_TIMEOUT
+                )
+        elif not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        token_users.set(key, user)
+        return user, self._token(key, user)
+
+    @staticmethod
+    def _token(key, user):
+        """Return an unsaved Token standing for the stored one"""
+        return Token(key=key, user=user)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate `Authorization: Bearer <access token>` without queries
+
+    request.user is a TokenUser holding only the primary key, enough for
+    filtering and assigning owned objects. Views that read or save other
+    user fields should keep TokenAuthentication. A deactivated user keeps
+    access until SIGNED_TOKEN_ACCESS_LIFETIME runs out.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        """Return (user, token) for a valid access token, or None"""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header.')
+            )
+        token = auth[1].decode('latin1')
+        try:
+            user_id = tokens.verify(token)
+        except SignatureExpired:
+            raise exceptions.AuthenticationFailed(_('Token expired.'))
+        except BadSignature:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return TokenUser(pk=user_id, active=True), token
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+def invalidate_tokens(keys=(), user_id=None):
+    """Drop cached token keys, and all of a user's when user_id is given"""
+    keys = list(keys)
+    if user_id is not None:
+        keys += Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True
+        )
+    token_users.invalidate(keys, user_id)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete_many([_shared_key(key) for key in keys])
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Forget a deleted token"""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, **kwargs):
+    """Forget the tokens of a changed user, who may have been deactivated"""
+    if not created:
+        invalidate_tokens(user_id=instance.pk)
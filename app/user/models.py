@@ -1,3 +1,14 @@
-from django.db import models
+from django.contrib.auth import get_user_model
 
-# Create your models here.
+
+class TokenUser(get_user_model()):
+    """A user known only by the id of a signed access token
+
+    Behaves as the user for filtering and assigning owned objects, but
+    its other fields are blank, so it refuses to be saved.
+    """
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError('A TokenUser only carries the user id.')
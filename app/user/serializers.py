@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model, authenticate
+from django.core.signing import BadSignature
 from rest_framework import serializers
 from django.utils.translation import ugettext_lazy as _
+from user import tokens
 
 
 class UserSerializer(serializers.HyperlinkedModelSerializer):
@@ -49,3 +51,20 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for exchanging a refresh token for an access token"""
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        """Check the refresh token against its current user"""
+        msg = _('Invalid or expired refresh token')
+        try:
+            user_id = tokens.claimed_user_id(attrs['refresh'])
+            user = get_user_model().objects.filter(pk=user_id).first()
+            tokens.verify(attrs['refresh'], tokens.REFRESH, user)
+        except BadSignature:
+            raise serializers.ValidationError(msg, code='authentication')
+        attrs['user'] = user
+        return attrs
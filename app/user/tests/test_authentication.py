@@ -0,0 +1,101 @@
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core import metrics
+from user.authentication import CachedTokenAuthentication, token_users
+
+PROFILE_URL = reverse('user:update')
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Test the cached token authentication"""
+
+    def setUp(self):
+        token_users.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="ycv005@gmail.com",
+            name="yash",
+            password="@P1q2w3e4r"
+        )
+        self.token = Token.objects.create(user=self.user)
+        metrics.reset()
+        self.auth = CachedTokenAuthentication()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_lookup(self):
+        """Test that a known token is authenticated without queries"""
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            cached, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(cached, user)
+        self.assertEqual(token.key, self.token.key)
+        self.assertEqual(metrics.snapshot(), {
+            'token_cache.hit': 1, 'token_cache.miss': 1
+        })
+
+    def test_shared_cache(self):
+        """Test that another process only fetches the user by its id"""
+        self.auth.authenticate_credentials(self.token.key)
+        token_users.clear()
+        with self.assertNumQueries(1):
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE=None)
+    def test_without_shared_cache(self):
+        """Test that the shared cache is optional"""
+        self.auth.authenticate_credentials(self.token.key)
+        token_users.clear()
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+        self.assertIsNone(cache.get(f'auth-token:{self.token.key}'))
+
+    def test_deleted_token(self):
+        """Test that a deleted token stops authenticating"""
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user(self):
+        """Test that a deactivated user stops authenticating"""
+        self.assertEqual(
+            self.client.get(PROFILE_URL).status_code, status.HTTP_200_OK
+        )
+        self.user.active = False
+        self.user.save()
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update(self):
+        """Test that the cached user reflects a profile update"""
+        self.client.get(PROFILE_URL)
+        self.client.patch(PROFILE_URL, {'name': 'new name'})
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.data['name'], 'new name')
+
+    def test_update_reloads_user(self):
+        """Test that updates don't revert writes of other processes"""
+        self.client.get(PROFILE_URL)
+        users = get_user_model().objects.filter(pk=self.user.pk)
+        # Queryset updates send no signals, like another process
+        users.update(password=make_password('changed'))
+        res = self.client.patch(PROFILE_URL, {'name': 'new name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'new name')
+        self.assertTrue(self.user.check_password('changed'))
+
+        users.update(active=False)
+        res = self.client.patch(PROFILE_URL, {'name': 'newer name'})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.user.name, 'new name')
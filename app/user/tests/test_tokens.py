@@ -0,0 +1,193 @@
+import os
+import time
+from unittest import skipUnless
+from django.core.signing import BadSignature, SignatureExpired
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+from user import tokens
+from user.authentication import SignedTokenAuthentication
+from user.models import TokenUser
+
+SIGNED_TOKEN_URL = reverse('user:signed-token')
+REFRESH_TOKEN_URL = reverse('user:refresh-token')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class SignedTokenTest(TestCase):
+    """Test signing and verifying tokens"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ycv005@gmail.com",
+            name="yash",
+            password="@P1q2w3e4r"
+        )
+
+    def test_access_token(self):
+        """Test that an access token is verified without queries"""
+        token, lifetime = tokens.issue(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(tokens.verify(token), self.user.pk)
+        self.assertEqual(lifetime, 300)
+
+    def test_invalid_tokens(self):
+        """Test that tampered, malformed and wrong kind tokens fail"""
+        token, _ = tokens.issue(self.user)
+        refresh, _ = tokens.issue(self.user, tokens.REFRESH)
+        other = token.replace(f'.{self.user.pk}.', f'.{self.user.pk + 1}.')
+        for bad in (other, token[:-2], 'token', refresh):
+            with self.assertRaises(BadSignature):
+                tokens.verify(bad)
+
+    @override_settings(SIGNED_TOKEN_ACCESS_LIFETIME=-1)
+    def test_expired_token(self):
+        """Test that an expired token fails"""
+        token, _ = tokens.issue(self.user)
+        with self.assertRaises(SignatureExpired):
+            tokens.verify(token)
+
+    def test_key_rotation(self):
+        """Test that tokens of a retired key verify until it is dropped"""
+        token, _ = tokens.issue(self.user)
+        keys = {'k1': 'first secret', 'k2': 'second secret'}
+        with self.settings(SIGNED_TOKEN_KEYS=keys):
+            old, _ = tokens.issue(self.user)
+            with self.settings(SIGNED_TOKEN_CURRENT_KEY='k2'):
+                new, _ = tokens.issue(self.user)
+                self.assertEqual(tokens.verify(old), self.user.pk)
+                self.assertEqual(tokens.verify(new), self.user.pk)
+                self.assertIn('.k2.', new)
+                with self.assertRaises(BadSignature):
+                    tokens.verify(token)
+        with self.settings(SIGNED_TOKEN_KEYS={'k2': 'second secret'}):
+            with self.assertRaises(BadSignature):
+                tokens.verify(old)
+
+    def test_token_user(self):
+        """Test that the user of an access token can't be saved"""
+        with self.assertRaises(TypeError):
+            TokenUser(pk=self.user.pk).save()
+
+
+class SignedTokenApiTest(TestCase):
+    """Test the signed token endpoints"""
+
+    def setUp(self):
+        self.credential = {
+            'email': "ycv005@gmail.com",
+            'password': "@P1q2w3e4r"
+        }
+        self.user = get_user_model().objects.create_user(
+            name="yash", **self.credential
+        )
+        self.client = APIClient()
+
+    def test_access_recipes(self):
+        """Test that a signed access token authenticates recipe requests"""
+        res = self.client.post(SIGNED_TOKEN_URL, self.credential)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        access = res.data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        res = self.client.post(RECIPE_URL, {
+            'name': 'Dal', 'time_took_min': 20, 'price': 3
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(self.user.recipe_set.filter(name='Dal').exists())
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bad_access_token(self):
+        """Test that a bad bearer token is refused"""
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer a.1.2.k1.sig')
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_challenge_unchanged(self):
+        """Test that unauthenticated requests are still challenged as Token"""
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    def test_invalid_credentials(self):
+        """Test that no tokens are signed for wrong credentials"""
+        self.credential['password'] = 'wrong'
+        res = self.client.post(SIGNED_TOKEN_URL, self.credential)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh(self):
+        """Test that a refresh token gives a new access token"""
+        refresh = self.client.post(
+            SIGNED_TOKEN_URL, self.credential
+        ).data['refresh']
+        res = self.client.post(REFRESH_TOKEN_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(tokens.verify(res.data['access']), self.user.pk)
+
+    def test_refresh_revoked(self):
+        """Test that a password change revokes refresh tokens"""
+        refresh = self.client.post(
+            SIGNED_TOKEN_URL, self.credential
+        ).data['refresh']
+        self.user.set_password('new password')
+        self.user.save()
+        res = self.client.post(REFRESH_TOKEN_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('access', res.data)
+
+    def test_refresh_survives_rehash(self):
+        """Test that a login upgrading the hash keeps refresh tokens"""
+        with self.settings(PASSWORD_HASHERS=[
+            'core.tests.test_hashing.FewIterationsHasher'
+        ]):
+            self.user.set_password(self.credential['password'])
+            self.user.save()
+            refresh = self.client.post(
+                SIGNED_TOKEN_URL, self.credential
+            ).data['refresh']
+        password = self.user.password
+        with self.settings(PASSWORD_HASHERS=[
+            'core.tests.test_hashing.MoreIterationsHasher'
+        ]):
+            res = self.client.post(SIGNED_TOKEN_URL, self.credential)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, password)
+        res = self.client.post(REFRESH_TOKEN_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@skipUnless(os.environ.get('BENCHMARK'), 'Set BENCHMARK=1 to run')
+class AuthenticationBenchmark(TestCase):
+    """Compare the per-request cost of database and signed tokens"""
+    rounds = 2000
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="bench@gmail.com",
+            name="bench",
+            password="testpassword"
+        )
+        self.factory = APIRequestFactory()
+
+    def cost(self, authentication, header):
+        """Return the mean seconds authenticate() takes"""
+        request = self.factory.get(RECIPE_URL, HTTP_AUTHORIZATION=header)
+        start = time.perf_counter()
+        for _ in range(self.rounds):
+            authentication.authenticate(request)
+        return (time.perf_counter() - start) / self.rounds
+
+    def test_cost(self):
+        """Test that signed tokens are cheaper to authenticate"""
+        key = Token.objects.create(user=self.user).key
+        access, _ = tokens.issue(self.user)
+        database = self.cost(TokenAuthentication(), f'Token {key}')
+        signed = self.cost(SignedTokenAuthentication(), f'Bearer {access}')
+        print(f"\nauthenticate(): TokenAuthentication {database * 1e6:.1f} "
+              f"us, SignedTokenAuthentication {signed * 1e6:.1f} us")
+        self.assertLess(signed, database)
@@ -0,0 +1,85 @@
+import base64
+import hashlib
+import hmac
+import time
+from functools import lru_cache
+from django.conf import settings
+from django.core.signing import BadSignature, SignatureExpired
+
+ACCESS = 'a'
+REFRESH = 'r'
+
+
+@lru_cache(maxsize=None)
+def _mac(secret):
+    """Return an HMAC primed with the key derived from secret"""
+    key = hashlib.sha256(b'user.tokens' + secret.encode()).digest()
+    return hmac.new(key, digestmod=hashlib.sha256)
+
+
+def _signature(kid, message):
+    """Return the base64 signature of message with the key kid"""
+    mac = _mac(settings.SIGNED_TOKEN_KEYS[kid]).copy()
+    mac.update(message.encode())
+    return base64.urlsafe_b64encode(mac.digest()).rstrip(b'=').decode()
+
+
+def _user_secret(user):
+    """Return what ties refresh tokens to the password and active flag
+
+    Not the password hash, which changes when a login upgrades it.
+    """
+    return f'{user.token_secret}:{int(user.active)}'
+
+
+def issue(user, kind=ACCESS):
+    """Return a signed token of kind for user and its lifetime in seconds
+
+    The token is `kind.user_id.expires.kid.signature`. Refresh tokens
+    are also signed with the user's token secret and active flag, so
+    changing the password or deactivating the user revokes them.
+    """
+    if kind == ACCESS:
+        lifetime = settings.SIGNED_TOKEN_ACCESS_LIFETIME
+    else:
+        lifetime = settings.SIGNED_TOKEN_REFRESH_LIFETIME
+    kid = settings.SIGNED_TOKEN_CURRENT_KEY
+    message = f'{kind}.{user.pk}.{int(time.time()) + lifetime}.{kid}'
+    signed = message if kind == ACCESS else (
+        f'{message}.{_user_secret(user)}'
+    )
+    return f'{message}.{_signature(kid, signed)}', lifetime
+
+
+def verify(token, kind=ACCESS, user=None):
+    """Return the user id of a valid token of kind
+
+    Access tokens are checked without queries. Refresh tokens need the
+    user they claim, see claimed_user_id. Raises BadSignature, or
+    SignatureExpired past the expiry.
+    """
+    try:
+        token_kind, user_id, expires, kid, signature = token.split('.')
+        user_id, expires = int(user_id), int(expires)
+    except ValueError:
+        raise BadSignature('Malformed token.')
+    if token_kind != kind or kid not in settings.SIGNED_TOKEN_KEYS:
+        raise BadSignature('Unknown token kind or key.')
+    message = token.rsplit('.', 1)[0]
+    if kind == REFRESH:
+        if user is None or user.pk != user_id:
+            raise BadSignature('Token of another user.')
+        message = f'{message}.{_user_secret(user)}'
+    if not hmac.compare_digest(signature, _signature(kid, message)):
+        raise BadSignature('Signature does not match.')
+    if expires < time.time():
+        raise SignatureExpired('Token expired.')
+    return user_id
+
+
+def claimed_user_id(token):
+    """Return the user id a token claims, before checking it"""
+    try:
+        return int(token.split('.')[1])
+    except (IndexError, ValueError):
+        raise BadSignature('Malformed token.')
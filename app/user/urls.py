@@ -1,10 +1,17 @@
 from django.urls import path
-from user.views import UserCreateView, CreateTokenView, ModifyUserView
+from user.views import (
+    UserCreateView, CreateTokenView, CreateSignedTokenView,
+    RefreshSignedTokenView, ModifyUserView
+)
 
 app_name = 'user'
 
 urlpatterns = [
     path('create/', UserCreateView.as_view(), name='create'),
     path('token/', CreateTokenView.as_view(), name='token'),
+    path('token/signed/', CreateSignedTokenView.as_view(),
+         name='signed-token'),
+    path('token/refresh/', RefreshSignedTokenView.as_view(),
+         name='refresh-token'),
     path('update/', ModifyUserView.as_view(), name='update')
 ]
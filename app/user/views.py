@@ -1,7 +1,14 @@
-from user.serializers import UserSerializer, AuthTokenSerializer
-from rest_framework import generics, authentication, permissions
+from user.serializers import (
+    UserSerializer, AuthTokenSerializer, RefreshTokenSerializer
+)
+from user import tokens
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions, generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication
 
 
 class UserCreateView(generics.CreateAPIView):
@@ -15,12 +22,55 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
+class CreateSignedTokenView(APIView):
+    """Create a signed access token and a refresh token for user"""
+    serializer_class = AuthTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request):
+        """Return the tokens of the user whose credentials were posted"""
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        access, lifetime = tokens.issue(user)
+        refresh, _ = tokens.issue(user, tokens.REFRESH)
+        return Response({
+            'access': access, 'refresh': refresh, 'expires_in': lifetime
+        })
+
+
+class RefreshSignedTokenView(APIView):
+    """Exchange a refresh token for a new access token"""
+    serializer_class = RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request):
+        """Return a new access token for a valid refresh token"""
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        access, lifetime = tokens.issue(serializer.validated_data['user'])
+        return Response({'access': access, 'expires_in': lifetime})
+
+
 class ModifyUserView(generics.RetrieveUpdateAPIView):
     """Class to modify authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        """Retrieve and return authentication user"""
-        return self.request.user
+        """Retrieve and return authentication user
+
+        The cached user may predate writes made by other processes, so
+        updates load the current row instead of saving the copy back.
+        """
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        user = get_user_model().objects.filter(
+            pk=self.request.user.pk, active=True
+        ).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed(
+                'User inactive or deleted.'
+            )
+        return user